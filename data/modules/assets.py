@@ -0,0 +1,169 @@
+from io import BytesIO
+from json import dumps, loads
+from mmap import ACCESS_READ, mmap
+from os import listdir, replace, sep, stat, walk
+from os.path import basename, dirname, isfile, join, normpath
+
+from pygame.font import Font
+from pygame.image import load, save
+from pygame.surface import Surface
+from pygame.transform import scale2x, smoothscale
+
+# all images and fonts in one file: magic, index length, index (json), files
+PACK_PATH = "data/assets.pack"
+PACK_MAGIC = b"MINEPAK2"
+PACKED_DIRECTORIES = ("data/img", "data/fonts")
+
+# images stored also already scaled (as they are loaded by the game)
+PRESCALED = (("data/img/guns/handgun", 1.5), ("data/img/guns/shotgun", 1.5), ("data/img/guns/minigun", 1.5),
+             ("data/img/player/idle", 1.5), ("data/img/player/run", 1.5), ("data/img/player/jump.png", 1.5),
+             ("data/img/spider_small/idle", 2), ("data/img/spider_small/run", 2), ("data/img/bullet.png", 2))
+
+
+def asset_key(path: str) -> str:
+    # the same file always has the same name in the index
+    return normpath(path).replace(sep, "/")
+
+
+def source_files() -> dict:
+    # name: (modification time, size) of every packed file - pack built from other ones is stale
+    sources = {}
+    for directory in PACKED_DIRECTORIES:
+        for root, _, names in walk(directory):
+            for name in names:
+                status = stat(join(root, name))
+                sources[asset_key(join(root, name))] = [status.st_mtime_ns, status.st_size]
+    return sources
+
+
+def scale_image(image: Surface, scale: float) -> Surface:
+    if scale == 2:
+        return scale2x(image)
+    if scale != 1:
+        return smoothscale(image, (image.get_width() * scale, image.get_height() * scale))
+    return image
+
+
+class AssetPack:
+    def __init__(self, path: str):
+        # file is memory-mapped, files are decoded only when asked for
+        self.file = open(path, "rb")
+        self.data = mmap(self.file.fileno(), 0, access=ACCESS_READ)
+        if self.data[:8] != PACK_MAGIC:
+            raise ValueError(f"{path} is not an asset pack")
+        index_length = int.from_bytes(self.data[8:16], "little")
+        index = loads(self.data[16:16 + index_length].decode())
+        self.files = index["files"]  # name: (offset, size)
+        self.sources = index["sources"]  # name: (modification time, size) of files the pack was built from
+        self.start = 16 + index_length
+
+        # directory listings (without scaled variants)
+        self.directories = {}
+        for key in self.files:
+            if "@" not in key:
+                self.directories.setdefault(dirname(key), []).append(basename(key))
+
+    def __contains__(self, path: str) -> bool:
+        return asset_key(path) in self.files
+
+    def read(self, path: str) -> bytes:
+        offset, size = self.files[asset_key(path)]
+        return self.data[self.start + offset:self.start + offset + size]
+
+
+def build_pack(path=PACK_PATH):
+    # python -m data.modules.assets (from the game directory)
+    files = {}
+    for directory in PACKED_DIRECTORIES:
+        for root, _, names in walk(directory):
+            for name in sorted(names):
+                with open(join(root, name), "rb") as f:
+                    files[asset_key(join(root, name))] = f.read()
+
+    for source, scale in PRESCALED:
+        names = [join(source, name) for name in listdir(source)] if not isfile(source) else [source]
+        for name in names:
+            image = scale_image(load(name).convert_alpha(), scale)
+            encoded = BytesIO()
+            save(image, encoded, "png")
+            files[f"{asset_key(name)}@{scale}"] = encoded.getvalue()
+
+    index = {"files": {}, "sources": source_files()}
+    offset = 0
+    for key, content in files.items():
+        index["files"][key] = (offset, len(content))
+        offset += len(content)
+    index_data = dumps(index).encode()
+
+    # the old pack can be memory-mapped right now, it's replaced instead of overwritten
+    with open(f"{path}.tmp", "wb") as f:
+        f.write(PACK_MAGIC)
+        f.write(len(index_data).to_bytes(8, "little"))
+        f.write(index_data)
+        for content in files.values():
+            f.write(content)
+    replace(f"{path}.tmp", path)
+    return len(files), offset
+
+
+def open_pack(path=PACK_PATH):
+    # pack if it exists and is up to date (no file in data/ added, removed or edited since it was built),
+    # otherwise None - everything is read from data/ directly
+    if not isfile(path):
+        return None
+    try:
+        opened = AssetPack(path)
+    except ValueError:
+        return None  # built by an older version
+    if opened.sources != source_files():
+        opened.data.close()
+        opened.file.close()
+        return None
+    return opened
+
+
+pack = open_pack()
+fonts = {}
+
+
+def list_images(path: str) -> list:
+    if pack is not None and asset_key(path) in pack.directories:
+        return pack.directories[asset_key(path)]
+    return listdir(path)
+
+
+def load_image(path: str) -> Surface:
+    if pack is not None and path in pack:
+        return load(BytesIO(pack.read(path)), basename(path))
+    return load(path)
+
+
+def load_prescaled(path: str, scale: float):
+    # image stored already scaled or None
+    if pack is not None and f"{path}@{scale}" in pack:
+        return load(BytesIO(pack.read(f"{path}@{scale}")), basename(path))
+    return None
+
+
+def load_font(path: str, size: int) -> Font:
+    # every font size is created once and shared
+    if (path, size) not in fonts:
+        if pack is not None and path in pack:
+            fonts[(path, size)] = Font(BytesIO(pack.read(path)), size)
+        else:
+            fonts[(path, size)] = Font(path, size)
+    return fonts[(path, size)]
+
+
+if __name__ == "__main__":
+    from os import environ
+    from time import perf_counter
+    from pygame import init
+    from pygame.display import set_mode
+
+    environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    init()
+    set_mode((1, 1))
+    start = perf_counter()
+    amount, size = build_pack()
+    print(f"{PACK_PATH}: {amount} files, {size / 1024:.0f} KiB in {perf_counter() - start:.2f} s")
@@ -0,0 +1,152 @@
+from numpy import logical_or
+from pygame.locals import BLEND_RGBA_MAX, RLEACCEL, SRCALPHA
+from pygame.surface import Surface
+from pygame.surfarray import array3d, array_alpha
+
+from .assets import load_image, load_prescaled, scale_image
+
+# transparent pixels of images with 1-bit alpha (not used by any opaque pixel)
+COLORKEY = (255, 0, 255)
+IMAGE_FORMATS = ("opaque", "colorkey", "alpha")
+
+
+def image_format(image: Surface) -> str:
+    # fastest way to blit the image: no transparency, colorkey (alpha only 0 or 255) or per-pixel alpha
+    alpha = array_alpha(image)
+    if alpha.min() == 255:
+        return "opaque"
+    if logical_or(alpha == 0, alpha == 255).all():
+        uses_colorkey = (array3d(image) == COLORKEY).all(axis=2) & (alpha == 255)
+        if not uses_colorkey.any():
+            return "colorkey"
+    return "alpha"
+
+
+def prepare_image(image: Surface) -> Surface:
+    # converted to the display format picked by image_format
+    # (colorkey images are RLE encoded - transparent runs are skipped when blitting)
+    image = image.convert_alpha()
+    kind = image_format(image)
+    if kind == "alpha":
+        return image
+    prepared = Surface(image.get_size()).convert()
+    if kind == "colorkey":
+        prepared.fill(COLORKEY)
+        prepared.set_colorkey(COLORKEY, RLEACCEL)
+    prepared.blit(image, (0, 0))
+    return prepared
+
+
+class Atlas:
+    def __init__(self, page_size=(1024, 1024)):
+        # small images packed into few big pages, everyone gets a subsurface
+        # (a normal Surface sharing pixels with the page), images of every format have their own pages
+        self.page_size = page_size
+        self.pages = {kind: [] for kind in IMAGE_FORMATS}
+        self.images = {}  # (path, scale): subsurface - every file is loaded only once
+
+        # shelf packing - images are put in rows, new row when the current one is full
+        self.shelves = {kind: [0, 0, 0] for kind in IMAGE_FORMATS}  # x, y, height of the current row
+
+    def load(self, path: str, scale=1) -> Surface:
+        if (path, scale) not in self.images:
+            image = load_prescaled(path, scale)
+            if image is None:
+                image = scale_image(load_image(path).convert_alpha(), scale)
+            self.images[(path, scale)] = self.pack(prepare_image(image))
+        return self.images[(path, scale)]
+
+    def pack(self, image: Surface) -> Surface:
+        width, height = image.get_size()
+        if width > self.page_size[0] or height > self.page_size[1]:
+            return image  # doesn't fit any page
+
+        if image.get_flags() & SRCALPHA:
+            kind = "alpha"
+        elif image.get_colorkey() is not None:
+            kind = "colorkey"
+        else:
+            kind = "opaque"
+        pages = self.pages[kind]
+        shelf = self.shelves[kind]
+
+        # next row, next page if there is no space for it
+        if shelf[0] + width > self.page_size[0]:
+            shelf[:] = [0, shelf[1] + shelf[2], 0]
+        if not pages or shelf[1] + height > self.page_size[1]:
+            if kind == "alpha":
+                pages.append(Surface(self.page_size, SRCALPHA).convert_alpha())
+            else:
+                pages.append(Surface(self.page_size).convert())
+                pages[-1].fill(COLORKEY)
+            shelf[:] = [0, 0, 0]
+
+        if kind == "alpha":
+            # page is fully transparent, max blending copies pixels as they are
+            pages[-1].blit(image, shelf[:2], special_flags=BLEND_RGBA_MAX)
+        else:
+            pages[-1].blit(image, shelf[:2])
+        packed = pages[-1].subsurface((shelf[0], shelf[1], width, height))
+        if kind == "colorkey":
+            packed.set_colorkey(COLORKEY, RLEACCEL)
+        shelf[0] += width
+        shelf[2] = max(shelf[2], height)
+        return packed
+
+
+# shared by everything loading sprites
+atlas = Atlas()
+
+
+# blits per frame of every category, per-pixel alpha vs prepared images:
+# python -m data.modules.atlas (from the game directory)
+if __name__ == "__main__":
+    from os import environ
+    from random import randint
+    from time import perf_counter
+    from pygame import init
+    from pygame.display import set_mode
+    from pygame.locals import BLEND_MULT, BLEND_RGBA_MULT
+
+    from .assets import list_images
+
+    environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    init()
+    screen = set_mode((1280, 720))
+
+    def images(path: str) -> list:
+        if path.endswith(".png"):
+            return [load_image(path)]
+        return [load_image(f"{path}/{name}") for name in sorted(list_images(path))]
+
+    def measure(blit_sequence, target=screen, special_flags=0, frames=50) -> float:
+        # ms per frame
+        start = perf_counter()
+        for _ in range(frames):
+            if special_flags:
+                for image, position in blit_sequence:
+                    target.blit(image, position, special_flags=special_flags)
+            else:
+                target.blits(blit_sequence, False)
+        return (perf_counter() - start) / frames * 1000
+
+    categories = {
+        "tiles": ("data/img/stone.png", "data/img/ladder.png", "data/img/platforms", "data/img/lava"),
+        "decorations": ("data/img/decorations", "data/img/torch"),
+        "enemies": ("data/img/slimes/green", "data/img/spider_big/run", "data/img/bat", "data/img/player/run"),
+        "lights": ("data/img/lights", )
+    }
+    for category, paths in categories.items():
+        sources = [image for path in paths for image in images(path)]
+        positions = [(randint(-32, 1280), randint(-32, 720)) for _ in range(600)]
+        alpha = [(sources[i % len(sources)].convert_alpha(), position) for i, position in enumerate(positions)]
+        prepared_images = [prepare_image(image) for image in sources]
+        prepared = [(prepared_images[i % len(sources)], position) for i, position in enumerate(positions)]
+        formats = ", ".join(f"{kind} {[image_format(image.convert_alpha()) for image in sources].count(kind)}" for kind in IMAGE_FORMATS)
+        print(f"{category} ({formats}): {len(positions)} blits, "
+              f"alpha {measure(alpha):.2f} ms, prepared {measure(prepared):.2f} ms")
+
+    # lights are multiplied with the frame (both opaque, alpha channel doesn't matter)
+    darkness = Surface(screen.get_size()).convert()
+    print(f"darkness multiply: rgba {measure([(darkness, (0, 0))], special_flags=BLEND_RGBA_MULT):.2f} ms, "
+          f"rgb {measure([(darkness, (0, 0))], special_flags=BLEND_MULT):.2f} ms")
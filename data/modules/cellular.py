@@ -1,97 +1,162 @@
-from random import randint
-from numpy import zeros
-from collections import deque
-
-
-def makeGrid(width, height):
-    newgrid = [[0 for x in range(height)] for y in range(width)]
-    for i in range(len(newgrid)):
-        for j in range(len(newgrid[i])):
-            if i==0 or j==0 or i==len(newgrid)-1 or j==len(newgrid[0])-1:
-                newgrid[i][j]=1
-    return newgrid
-
-
-def populateGrid(grid, chance):
-    for i in range(len(grid)): # reminder to test with: for index, value in enumerate(grid)
-        for j in range(len(grid[0])):
-            if(randint(0,100)<=chance): # test with list comprehension instead??
-                grid[i][j]=1
-    return grid
-
-
-def automataIteration(grid, minCount, makePillars):
-    new_grid = [row[:] for row in grid]
-    for i in range(1, len(grid)-1):
-        for j in range(1, len(grid[0])-1):
-            count = 0
-            for k in range(-1,2):
-                for l in range(-1,2):
-                    if grid[i+k][j+l]==1:
-                        count+=1
-            if count>=minCount or (count==0 and makePillars==1):
-                new_grid[i][j]=1
-            else:
-                new_grid[i][j]=0
-    return new_grid
-
-
-def floodFindEmpty(grid, tries, goal):
-    times_remade = 0
-    percentage = 0
-
-    while times_remade<tries and percentage<goal:
-        copy_grid = [row[:] for row in grid]
-        open_count = 0
-        times_remade+=1
-        unvisited = deque([])
-        new_grid = [[1 for x in range(len(grid[0]))] for y in range(len(grid))]
-        #find a random empty space, hope it's the biggest cave
-        randx = randint(0,len(grid)-1)
-        randy = randint(0,len(grid[0])-1)
-        while(grid[randx][randy] == 1):
-            randx = randint(0,len(grid)-1)
-            randy = randint(0,len(grid[0])-1)
-        unvisited.append([randx, randy])
-        while len(unvisited)>0:
-            current = unvisited.popleft()
-            new_grid[current[0]][current[1]] = 0
-            for k in range(-1,2):
-                for l in range(-1,2):
-                    if current[0]+k >= 0 and current[0]+k<len(grid) and current[1]+l >= 0 and current[1]+l < len(grid[0]): #if we're not out of bounds
-                        if copy_grid[current[0]+k][current[1]+l]==0: #if it's an empty space
-                            copy_grid[current[0]+k][current[1]+l]=2 #mark visited
-                            open_count += 1
-                            unvisited.append([current[0]+k, current[1]+l])
-        percentage = open_count*100/(len(grid)*len(grid[0]))
-        
-    return new_grid, percentage
-
-
-def generate_map(width, height, iterations=5, pillarIterations=2, goalPercentage=30):
-    # width = int(input("Enter the width: "))
-    # height = int(input("Enter the height: "))
-    #chance = 100 - int(input("Enter the percentage chance of randomly generating a wall: "))
-    #count = int(input("Enter the min count of surrounding walls for the automata rules: "))
-    chance = 40
-    count = 5
-    # iterations = int(input("Enter the number of regular iterations: "))
-    # pillarIterations = int(input("Enter the number of pillar-generating iterations: "))
-    floodTries = 5
-    # goalPercentage = 30 # above 30% seems to be a good target
-
-    grid = makeGrid(width, height)
-
-    grid = populateGrid(grid, chance)
-
-    for i in range(pillarIterations):
-        grid = automataIteration(grid, count, 1)
-
-    for i in range(iterations):
-        grid = automataIteration(grid, count, 0)
-
-    grid, percentage = floodFindEmpty(grid, floodTries, goalPercentage)
-    if percentage<goalPercentage:
-        return generate_map(width, height, iterations, pillarIterations)
-    else:
-        return grid
+from time import perf_counter
+from numpy import (add, arange, array, bincount, clip, cumsum, diff, int8, int64,
+                   nonzero, ones, random, repeat, searchsorted, uint8, zeros)
+
+
+def makeGrid(width, height):
+    newgrid = zeros((width, height), dtype=uint8)
+    # solid border around the whole map
+    newgrid[0, :] = 1
+    newgrid[-1, :] = 1
+    newgrid[:, 0] = 1
+    newgrid[:, -1] = 1
+    return newgrid
+
+
+def populateGrid(grid, chance):
+    # same odds as randint(0, 100) <= chance, rolled for every cell at once
+    grid[random.randint(0, 101, grid.shape) <= chance] = 1
+    return grid
+
+
+def countNeighbours(grid):
+    # sum of the 3x3 block around every inner cell (cell itself included),
+    # built from nine shifted views of the grid instead of per-cell loops
+    width, height = grid.shape
+    count = zeros((width - 2, height - 2), dtype=uint8)
+    for k in range(3):
+        for l in range(3):
+            count += grid[k:width - 2 + k, l:height - 2 + l]
+    return count
+
+
+def automataIteration(grid, minCount, makePillars):
+    new_grid = grid.copy()
+    count = countNeighbours(grid)
+    alive = count >= minCount
+    if makePillars == 1:
+        alive |= count == 0
+    new_grid[1:-1, 1:-1] = alive
+    return new_grid
+
+
+def findRuns(grid):
+    # horizontal runs of empty cells as (row, first column, last column + 1),
+    # in row-major order
+    width, height = grid.shape
+    padded = zeros((width, height + 2), dtype=int8)
+    padded[:, 1:-1] = grid == 0
+    edges = diff(padded, axis=1)
+    rows, starts = nonzero(edges == 1)
+    ends = nonzero(edges == -1)[1]
+    return rows, starts, ends
+
+
+def linkRuns(rows, starts, ends, height):
+    # pairs of runs on neighbouring rows that touch, diagonals included
+    # (same neighbourhood as the automata rules). Runs of one row are sorted
+    # and disjoint, so the runs touching a given run form one contiguous
+    # slice of the next row, found with two binary searches
+    stride = height + 2
+    start_keys = rows * stride + starts + 1
+    end_keys = rows * stride + ends
+    below = (rows + 1) * stride
+    first = searchsorted(end_keys, below + starts, "left")
+    last = searchsorted(start_keys, below + ends + 1, "right")
+    counts = clip(last - first, 0, None)
+    upper = repeat(arange(len(rows)), counts)
+    lower = arange(counts.sum()) - repeat(cumsum(counts) - counts, counts) + repeat(first, counts)
+    return upper, lower
+
+
+def findCaves(grid):
+    # single pass connected-components labelling of empty cells:
+    # union-find over horizontal runs instead of flooding cell by cell
+    rows, starts, ends = findRuns(grid)
+    parents = list(range(len(rows)))
+
+    def find(run):
+        while parents[run] != run:
+            parents[run] = parents[parents[run]]
+            run = parents[run]
+        return run
+
+    for upper, lower in zip(*linkRuns(rows, starts, ends, grid.shape[1])):
+        upper, lower = find(int(upper)), find(int(lower))
+        if upper != lower:
+            parents[max(upper, lower)] = min(upper, lower)
+
+    labels = array([find(run) for run in range(len(rows))], dtype=int64)
+    sizes = bincount(labels, weights=ends - starts, minlength=len(rows)).astype(int64)
+    return (rows, starts, ends), labels, sizes
+
+
+def keepLargestCave(grid):
+    # fill every cave except the biggest one, deterministically
+    new_grid = ones(grid.shape, dtype=uint8)
+    runs, labels, sizes = findCaves(grid)
+    if not len(labels):
+        return new_grid, 0, []
+    rows, starts, ends = runs
+    largest = labels == sizes.argmax()
+    # carve the largest cave back out: +1 at run starts, -1 at run ends,
+    # cumulative sum along the row marks the cells in between
+    carved = zeros((grid.shape[0], grid.shape[1] + 1), dtype=int8)
+    add.at(carved, (rows[largest], starts[largest]), 1)
+    add.at(carved, (rows[largest], ends[largest]), -1)
+    new_grid[cumsum(carved, axis=1)[:, :-1] > 0] = 0
+
+    region_sizes = sorted(sizes[sizes > 0].tolist(), reverse=True)
+    percentage = region_sizes[0] * 100 / grid.size
+    return new_grid, percentage, region_sizes
+
+
+def generate_map(width, height, iterations=5, pillarIterations=2, goalPercentage=30):
+    # width = int(input("Enter the width: "))
+    # height = int(input("Enter the height: "))
+    #chance = 100 - int(input("Enter the percentage chance of randomly generating a wall: "))
+    #count = int(input("Enter the min count of surrounding walls for the automata rules: "))
+    chance = 40
+    count = 5
+    # iterations = int(input("Enter the number of regular iterations: "))
+    # pillarIterations = int(input("Enter the number of pillar-generating iterations: "))
+    tries = 5
+    # goalPercentage = 30 # above 30% seems to be a good target
+
+    # regenerate a bounded number of times, keep the most open map
+    best_grid, best_percentage = None, -1
+    for _ in range(tries):
+        grid = makeGrid(width, height)
+
+        grid = populateGrid(grid, chance)
+
+        for i in range(pillarIterations):
+            grid = automataIteration(grid, count, 1)
+
+        for i in range(iterations):
+            grid = automataIteration(grid, count, 0)
+
+        grid, percentage, region_sizes = keepLargestCave(grid)
+        if percentage > best_percentage:
+            best_grid, best_percentage = grid, percentage
+        if percentage >= goalPercentage:
+            break
+
+    return best_grid
+
+
+# benchmark of the automata steps: python data/modules/cellular.py
+if __name__ == "__main__":
+    for size in (64, 128, 256, 512, 1024, 2048):
+        start = perf_counter()
+        grid = populateGrid(makeGrid(size, size), 40)
+        for i in range(2):
+            grid = automataIteration(grid, 5, 1)
+        for i in range(5):
+            grid = automataIteration(grid, 5, 0)
+        elapsed = perf_counter() - start
+        start = perf_counter()
+        grid, percentage, region_sizes = keepLargestCave(grid)
+        labelled = perf_counter() - start
+        print(f"{size}x{size}: automata {elapsed * 1000:.1f} ms, caves {labelled * 1000:.1f} ms, "
+              f"{len(region_sizes)} caves, largest {percentage:.1f}%")
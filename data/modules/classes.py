@@ -1,20 +1,45 @@
 from random import randint
 from math import sin, cos, radians
 
-from pygame.image import load
 from pygame.math import Vector2
 from pygame.sprite import Group, Sprite
 from pygame.surface import Surface
 from pygame.transform import scale
 
-from .constants import GRAVITY, SCREEN_SIZE, WHITE
+from .assets import load_image
+from .atlas import atlas, prepare_image
+from .constants import BLACK, GRAVITY, SCREEN_SIZE, WHITE
+from .render import RenderQueue
 from .texts import DamageText
 
 
+class ScreenFade:
+    def __init__(self, fading: bool):
+        # fading - to black, otherwise from black
+        self.fading = fading
+        self.fade_surface = Surface(SCREEN_SIZE)
+        self.fade_surface.fill(BLACK)
+        if fading:
+            self.alphas = range(0, 257, 24)
+        else:
+            self.alphas = range(256, -2, -24)
+        self.frame = 0
+
+    @property
+    def finished(self) -> bool:
+        return self.frame >= len(self.alphas)
+
+    def draw(self, screen: Surface):
+        # one step of the fade per frame, drawn over already rendered frame
+        self.fade_surface.set_alpha(self.alphas[min(self.frame, len(self.alphas) - 1)])
+        screen.blit(self.fade_surface, (0, 0))
+        self.frame += 1
+
+
 class HealthBar:
     def __init__(self):
-        self.health_border = scale(load("data/img/bars/HealthBar.png").convert_alpha(), (192, 36))
-        self.health_bar = scale(load("data/img/bars/HealthBar2.png").convert_alpha(), (153, 21))
+        self.health_border = prepare_image(scale(load_image("data/img/bars/HealthBar.png"), (192, 36)))
+        self.health_bar = prepare_image(scale(load_image("data/img/bars/HealthBar2.png"), (153, 21)))
         self.size = self.health_bar.get_size()
 
     def draw(self, screen: Surface, health: int, max_health: int):
@@ -30,8 +55,8 @@ class HealthBar:
 
 class ManaBar:
     def __init__(self):
-        self.mana_border = scale(load("data/img/bars/ManaBar.png").convert_alpha(), (192, 36))
-        self.mana_bar = scale(load("data/img/bars/ManaBar2.png").convert_alpha(), (153, 21))
+        self.mana_border = prepare_image(scale(load_image("data/img/bars/ManaBar.png"), (192, 36)))
+        self.mana_bar = prepare_image(scale(load_image("data/img/bars/ManaBar2.png"), (153, 21)))
         self.size = self.mana_bar.get_size()
 
     def draw(self, screen: Surface, mana: float, max_mana: int):
@@ -62,10 +87,10 @@ class Bullet(Sprite):
 
         self.damage = randint(damage[0], damage[1])
 
-    def draw(self, screen: Surface, scroll: list):
-        screen.blit(self.image, (self.rect.x - scroll[0], self.rect.y - scroll[1]))
+    def draw(self, queue: RenderQueue, scroll: list):
+        queue.blit(self.image, (self.rect.x - scroll[0], self.rect.y - scroll[1]))
 
-    def update(self, screen: Surface, scroll: list,  tiles: set, enemies: Group, texts: Group):
+    def update(self, tiles: set, enemies: Group, texts: Group):
         # update bullet x position
         self.true_position.x += self.vector.x
         self.rect.x = int(self.true_position.x)
@@ -111,9 +136,6 @@ class Bullet(Sprite):
                 self.kill()
                 return score
 
-        # draw bullet
-        self.draw(screen, scroll)
-
 
 class Gold(Sprite):
     def __init__(self, position: tuple, amount: int):
@@ -131,7 +153,7 @@ class Gold(Sprite):
             i = 25
         else:
             i = 50
-        self.image = load(f"data/img/gold/{i}.png").convert_alpha()
+        self.image = atlas.load(f"data/img/gold/{i}.png")
         self.rect = self.image.get_rect(midbottom=position)
         self.vel_y = 0
 
@@ -142,12 +164,10 @@ class Gold(Sprite):
                 self.vel_y = 0
                 break
 
-    def draw(self, screen: Surface, scroll: list):
-        screen.blit(self.image, (self.rect.x - scroll[0], self.rect.y - scroll[1]))
+    def draw(self, queue: RenderQueue, scroll: list):
+        queue.blit(self.image, (self.rect.x - scroll[0], self.rect.y - scroll[1]))
 
-    def update(self, screen: Surface, scroll: list, tiles: set):
+    def update(self, tiles: set):
         self.vel_y += GRAVITY
         self.rect.y += self.vel_y
         self.check_vertical_collisions(tiles)
-
-        self.draw(screen, scroll)
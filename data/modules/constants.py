@@ -1,6 +1,19 @@
 # settings constants
 SCREEN_SIZE = (1280, 720)
+RENDER_SCALES = (1, 0.5)  # internal resolution steps, relative to SCREEN_SIZE (0.5 - 640x360), integer upscale only
+RENDER_SCALE = 1  # internal resolution the game starts with
+DYNAMIC_RESOLUTION = False  # lower internal resolution when frames are too slow, raise it back with headroom
 CHUNK_SIZE = 8
+CHUNK_CACHE_SIZE = 64  # built chunks kept in memory
+SIMULATION_MARGIN = 128  # pixels around the screen where enemies, bullets and gold are still updated
+ENEMY_FULL_RATE_DISTANCE = 384  # enemies this close to the player (any that can see it) are updated every frame
+ENEMY_AI_INTERVAL = 4  # farther visible enemies decide (vision, idling, animation) at most every few frames...
+ENEMY_AI_BUDGET = 8  # ...and only this many of them per frame, the rest only moves
+VECTORIZED_ENEMIES = False  # slimes and spiders moved all at once by numpy (simulation.py) instead of one by one
+FLOW_FIELD_RADIUS = 16  # cells around the player in which bats find their way to it
+PURSUIT_DISTANCE = 24  # advanced spiders follow the player over platforms and ladders up to this path cost
+ROUTE_CACHE_SIZE = 16  # searched paths (by target cell) kept for other spiders
+SLEEP_ENEMIES = True  # enemies far from the player are kept aside (not updated) until they are near again
 FPS = 60
 TILE_SIZE = 64
 GRAVITY = 0.8
@@ -1,4 +1,4 @@
-from math import atan2, cos, floor, radians, sin
+from math import atan2, cos, floor, radians, sin, sqrt
 from random import choice, randint
 
 from pygame.math import Vector2
@@ -6,12 +6,13 @@ from pygame.rect import Rect
 from pygame.sprite import Group, Sprite
 from pygame.surface import Surface
 from pygame.time import get_ticks
-from pygame.transform import flip, smoothscale
 
 from .classes import Gold
 from .constants import GOLD, GRAVITY, GREEN, ORANGE, RED, TILE_SIZE
 from .functions import load_images
 from .guns import Handgun, Minigun, Shotgun
+from .navigation import FlowField, NavGraph
+from .render import RenderQueue, frame_variant
 from .texts import DamageText
 
 
@@ -19,14 +20,7 @@ class Player(Sprite):
     def __init__(self, position: tuple, images: tuple, selected_gun: str, enemies: Group, gold_group: Group, bullet_group: Group, texts: Group, upgrades: list, gold: int, health: int, max_health: int):
         super().__init__()
 
-        self.animations = {"idle": [], "run": [], "climb": images[2], "jump": []}
-        for image in images[0]:
-            self.animations["idle"].append(smoothscale(image, (image.get_width() * 1.5, image.get_height() * 1.5)))
-        for image in images[1]:
-            self.animations["run"].append(smoothscale(image, (image.get_width() * 1.5, image.get_height() * 1.5)))
-        self.animations["idle"] = tuple(self.animations["idle"])
-        self.animations["run"] = tuple(self.animations["run"])
-        self.animations["jump"].append(smoothscale(images[3], (images[3].get_width() * 1.5, images[3].get_height() * 1.5)))
+        self.animations = {"idle": images[0], "run": images[1], "climb": images[2], "jump": [images[3]]}
         self.frame_index = 0
         self.action = "idle"
         self.cooldowns = {"idle": 0.15, "run": 0.3, "climb": 0.2, "jump": 0.01}
@@ -232,10 +226,42 @@ class Player(Sprite):
                 return gold.amount * 10
         return
 
-    def draw(self, screen: Surface, scroll: set):
-        screen.blit(self.image, (self.rect.x - scroll[0], self.rect.y - scroll[1]))
+    def draw(self, queue: RenderQueue, scroll: list):
+        queue.blit(self.image, (self.rect.x - scroll[0], self.rect.y - scroll[1]))
 
-    def update(self, screen: Surface, scroll: list, objects: dict):
+        # draw gun
+        if not self.climbing:
+            if not self.on_ground:
+                if self.up:
+                    offset_y = -16
+                else:
+                    offset_y = -8
+            else:
+                offset_y = 0
+
+            if not self.up and not self.down:
+                if not self.flip:
+                    queue.blit(self.gun_images[0], (self.rect.x - scroll[0], self.rect.y - scroll[1] + offset_y))
+                else:
+                    image = frame_variant(self.gun_images[0], True)
+                    image_rect = image.get_rect(topright=(self.rect.right - scroll[0], self.rect.y - scroll[1] + offset_y))
+                    queue.blit(image, image_rect)
+            elif self.up:
+                if not self.flip:
+                    queue.blit(self.gun_images[1], (self.rect.x - scroll[0], self.rect.y - scroll[1] + offset_y))
+                else:
+                    image = frame_variant(self.gun_images[1], True)
+                    image_rect = image.get_rect(topright=(self.rect.right - scroll[0], self.rect.y - scroll[1] + offset_y))
+                    queue.blit(image, image_rect)
+            elif self.down:
+                if not self.flip:
+                    queue.blit(self.gun_images[2], (self.rect.x - scroll[0], self.rect.y - scroll[1] + offset_y))
+                else:
+                    image = frame_variant(self.gun_images[2], True)
+                    image_rect = image.get_rect(topright=(self.rect.right - scroll[0], self.rect.y - scroll[1] + offset_y))
+                    queue.blit(image, image_rect)
+
+    def update(self, objects: dict):
         # update x position and check for horizontal collisions
         self.rect.x += self.vector.x
         self.check_horizontal_collisions(objects["collidable"])
@@ -323,51 +349,11 @@ class Player(Sprite):
         if self.frame_index >= len(self.animations[self.action]):
             self.frame_index = 0
         # set new frame to the image and flip it if necessary
-        self.image = flip(self.animations[self.action][floor(self.frame_index)], self.flip, False)
-
-        # blinking if damaged
-        if self.invincible:
-            if sin(get_ticks()) >= 0:
-                self.image.set_alpha(255)
-            else:
-                self.image.set_alpha(63)
-        else:
-            self.image.set_alpha(255)
-
-        # draw player
-        self.draw(screen, scroll)
-
-        # draw gun
-        if not self.climbing:
-            if not self.on_ground:
-                if self.up:
-                    offset_y = -16
-                else:
-                    offset_y = -8
-            else:
-                offset_y = 0
+        self.image = frame_variant(self.animations[self.action][floor(self.frame_index)], self.flip)
 
-            if not self.up and not self.down:
-                if not self.flip:
-                    screen.blit(self.gun_images[0], (self.rect.x - scroll[0], self.rect.y - scroll[1] + offset_y))
-                else:
-                    image = flip(self.gun_images[0], True, False)
-                    image_rect = image.get_rect(topright=(self.rect.right - scroll[0], self.rect.y - scroll[1] + offset_y))
-                    screen.blit(image, image_rect)
-            elif self.up:
-                if not self.flip:
-                    screen.blit(self.gun_images[1], (self.rect.x - scroll[0], self.rect.y - scroll[1] + offset_y))
-                else:
-                    image = flip(self.gun_images[1], True, False)
-                    image_rect = image.get_rect(topright=(self.rect.right - scroll[0], self.rect.y - scroll[1] + offset_y))
-                    screen.blit(image, image_rect)
-            elif self.down:
-                if not self.flip:
-                    screen.blit(self.gun_images[2], (self.rect.x - scroll[0], self.rect.y - scroll[1] + offset_y))
-                else:
-                    image = flip(self.gun_images[2], True, False)
-                    image_rect = image.get_rect(topright=(self.rect.right - scroll[0], self.rect.y - scroll[1] + offset_y))
-                    screen.blit(image, image_rect)
+        # blinking if damaged (dimmed copy, frames are shared)
+        if self.invincible and sin(get_ticks()) < 0:
+            self.image = frame_variant(self.image, dimmed=True)
 
         return score
 
@@ -409,6 +395,9 @@ class EnemyBase(Sprite):
         self.idling = False
         self.idling_counter = 0
 
+        self.thought_at = 0  # frame of the last full update (see EnemyScheduler)
+        self.simulation = None  # GroundSimulation moving the enemy instead of update (if any)
+
     def get_damage(self, damage: int):
         self.health -= damage
         self.blinking = 30
@@ -416,10 +405,12 @@ class EnemyBase(Sprite):
             if self.gold_amount > 0:
                 self.gold_group.add(Gold((randint(self.rect.left, self.rect.right), self.rect.bottom), self.gold_amount))
             self.kill()
+            if self.simulation is not None:
+                self.simulation.remove(self)
             return self.score_amount
 
-    def draw(self, screen: Surface, scroll: list):
-        screen.blit(self.image, (self.rect.x - scroll[0], self.rect.y - scroll[1]))
+    def draw(self, queue: RenderQueue, scroll: list):
+        queue.blit(self.image, (self.rect.x - scroll[0], self.rect.y - scroll[1]))
 
     def check_horizontal_collisions(self, tiles: set):
         for tile in tiles:
@@ -443,6 +434,36 @@ class EnemyBase(Sprite):
                 self.vector.y = 0
                 break
 
+    def check_constraints(self, constraints: set):
+        pass  # only spiders turn around on constraints
+
+    def stop_idling(self):
+        # after idle - stop idling, randomly select direction of moving
+        self.idling = False
+        self.vector.x *= choice((-1, 1))
+
+    def tick(self):
+        # frames with movement only (see EnemyScheduler) still count down idling and blinking
+        if self.blinking:
+            self.blinking -= 1
+        if self.idling:
+            self.idling_counter -= 1
+            if self.idling_counter <= 0:
+                self.stop_idling()
+
+    def move(self, tiles: set, platforms: set, constraints: Group):
+        # movement only, without decisions, vision and animation (enemies far from the player)
+        if not self.idling:
+            self.rect.x += self.vector.x
+            self.check_horizontal_collisions(tiles)
+            self.check_constraints(constraints)
+
+        self.vector.y += GRAVITY
+        self.rect.y += self.vector.y
+        self.check_vertical_collisions(set.union(tiles, platforms))
+        if self.vector.y > 18:
+            self.vector.y = 18
+
 
 class Slime(EnemyBase):
     def __init__(self, position: tuple, images: tuple, gold_group: Group):
@@ -458,10 +479,10 @@ class Slime(EnemyBase):
 
         self.vector.x = self.speed * choice((-1, 1))
 
-    def draw(self, screen: Surface, scroll: list):
-        screen.blit(self.image, (self.rect.x - 8 - scroll[0], self.rect.y - 16 - scroll[1]))
+    def draw(self, queue: RenderQueue, scroll: list):
+        queue.blit(self.image, (self.rect.x - 8 - scroll[0], self.rect.y - 16 - scroll[1]))
 
-    def update(self, screen: Surface, scroll: list, tiles: set, platforms: set, player_rect: Rect, constraints: Group):
+    def update(self, tiles: set, platforms: set, player_rect: Rect, constraints: Group):
         if self.vector.x > 0:
             self.flip = True
         elif self.vector.x < 0:
@@ -471,7 +492,7 @@ class Slime(EnemyBase):
         if self.frame_index >= self.animation_length:
             self.frame_index = 0
         # set new frame to the image and flip it if necessary
-        self.image = flip(self.animation[floor(self.frame_index)], self.flip, False)
+        self.image = frame_variant(self.animation[floor(self.frame_index)], self.flip)
 
         if not self.idling:
             # update x position and check for horizontal collisions
@@ -484,10 +505,8 @@ class Slime(EnemyBase):
                 self.idling_counter = randint(30, 70)
         else:
             self.idling_counter -= 1
-            # after idle - stop idling, randomly select direction of moving
             if self.idling_counter <= 0:
-                self.idling = False
-                self.vector.x *= choice((-1, 1))
+                self.stop_idling()
 
         # update y position and check collisions with tiles
         self.vector.y += GRAVITY
@@ -498,18 +517,11 @@ class Slime(EnemyBase):
         if self.vector.y > 18:
             self.vector.y = 18
 
-        # blinking if damaged
+        # blinking if damaged (dimmed copy, frames are shared)
         if self.blinking:
             self.blinking -= 1
-            if sin(get_ticks()) >= 0:
-                self.image.set_alpha(255)
-            else:
-                self.image.set_alpha(63)
-        else:
-            self.image.set_alpha(255)
-
-        # draw enemy on the screen
-        self.draw(screen, scroll)
+            if sin(get_ticks()) < 0:
+                self.image = frame_variant(self.image, dimmed=True)
 
 
 class Spider(EnemyBase):
@@ -533,12 +545,16 @@ class Spider(EnemyBase):
             self.action = new_action
             self.frame_index = 0
 
+    def stop_idling(self):
+        super().stop_idling()
+        self.update_action("run")
+
     def check_constraints(self, constraints: set):
         for constraint in constraints:
             if self.rect.colliderect(constraint):
                 self.vector.x *= -1
 
-    def update(self, screen: Surface, scroll: list, tiles: set, platforms: set, player_rect: Rect, constraints: Group):
+    def update(self, tiles: set, platforms: set, player_rect: Rect, constraints: Group):
         if not self.idling:
             # random idle
             if randint(1, 50) == 1:
@@ -552,11 +568,8 @@ class Spider(EnemyBase):
             self.check_constraints(constraints)
         else:
             self.idling_counter -= 1
-            # after idle - stop idling, randomly select direction of moving
             if self.idling_counter <= 0:
-                self.idling = False
-                self.update_action("run")
-                self.vector.x *= choice((-1, 1))
+                self.stop_idling()
 
         # update y position and check collisions with tiles
         self.vector.y += GRAVITY
@@ -574,22 +587,15 @@ class Spider(EnemyBase):
         # set new frame to the image and flip it if necessary
         self.image = self.animations[self.action][floor(self.frame_index)]
 
-        # blinking if damaged
+        # blinking if damaged (dimmed copy, frames are shared)
         if self.blinking:
             self.blinking -= 1
-            if sin(get_ticks()) >= 0:
-                self.image.set_alpha(255)
-            else:
-                self.image.set_alpha(63)
-        else:
-            self.image.set_alpha(255)
-
-        # draw enemy on the screen
-        self.draw(screen, scroll)
+            if sin(get_ticks()) < 0:
+                self.image = frame_variant(self.image, dimmed=True)
 
 
 class SpiderAdvanced(EnemyBase):
-    def __init__(self, position: tuple, images: tuple, gold_group: Group):
+    def __init__(self, position: tuple, images: tuple, gold_group: Group, nav_graph: NavGraph):
         super().__init__(position, 6, (1, 2), (5, 6), (0, 2), gold_group)
 
         self.animations = {"idle": images[0], "run": images[1]}
@@ -604,50 +610,107 @@ class SpiderAdvanced(EnemyBase):
         self.rect = self.image.get_rect(topleft=position)
         self.vision_rect = Rect(0, 0, 640, 240)
 
+        # following the player over platforms and ladders (paths from the level's navigation graph)
+        self.nav_graph = nav_graph
+        self.chasing = False
+        self.climbing = False
+
     def update_action(self, new_action: str):
         if new_action != self.action:
             self.action = new_action
             self.frame_index = 0
 
+    def stop_idling(self):
+        super().stop_idling()
+        self.update_action("run")
+
     def check_constraints(self, constraints: set):
         for constraint in constraints:
             if self.rect.colliderect(constraint):
                 self.vector.x *= -1
 
-    def update(self, screen: Surface, scroll: list, tiles: set, platforms: set, player_rect: Rect, contraints: Group):
+    def check_ceiling_collisions(self, tiles: set):
+        # jumping up through platforms, but not through stone
+        for tile in tiles:
+            if tile.rect.colliderect(self.rect):
+                self.rect.top = tile.rect.bottom
+                self.vector.y = 0
+                break
+
+    def move(self, tiles: set, platforms: set, constraints: Group):
         if not self.idling:
-            # random idle
-            if randint(1, 50) == 1:
-                self.idling = True
-                self.update_action("idle")
-                self.idling_counter = randint(30, 70)
-                
-            # update x position and check for horizontal collisions
             self.rect.x += self.vector.x
             self.check_horizontal_collisions(tiles)
-            self.check_constraints(contraints)
-        else:
-            self.idling_counter -= 1
-            # after idle - stop idling, randomly select direction of moving
-            if self.idling_counter <= 0:
-                self.idling = False
-                self.update_action("run")
-                self.vector.x *= choice((-1, 1))
+            # constraints keep patrolling spiders on their ledge, chasing ones can drop down
+            if not self.chasing:
+                self.check_constraints(constraints)
+
+        # holding a ladder - no gravity
+        if self.climbing and self.nav_graph.on_ladder(self.rect):
+            self.rect.y += self.vector.y
+            return
+        self.climbing = False
 
-        # update y position and check collisions with tiles
         self.vector.y += GRAVITY
         self.rect.y += self.vector.y
-        self.check_vertical_collisions(set.union(tiles, platforms))
-
-        # set max falling spedd - temp fix for bug with platform collision
+        if self.vector.y < 0:
+            self.check_ceiling_collisions(tiles)
+        else:
+            self.check_vertical_collisions(set.union(tiles, platforms))
         if self.vector.y > 18:
             self.vector.y = 18
 
+    def follow(self, step: tuple):
+        # next move of the path to the player
+        (x, y), kind, _ = step
+        center = x * TILE_SIZE + TILE_SIZE // 2
+        if kind == "climb":
+            self.climbing = True
+            self.rect.centerx = center
+            self.vector.x = 0
+            self.vector.y = -self.speed if (y + 1) * TILE_SIZE < self.rect.bottom else self.speed
+            return
+
+        if self.climbing:
+            self.vector.y = 0  # walking off the ladder
+        self.climbing = self.nav_graph.on_ladder(self.rect)
+        if center < self.rect.centerx - 5:
+            self.vector.x = -self.speed
+        elif center > self.rect.centerx + 5:
+            self.vector.x = self.speed
+        else:
+            self.vector.x = 0
+        # jump just high enough to land on the cell (only if it's above)
+        if kind == "jump" and self.vector.y == 0 and self.rect.bottom > (y + 1) * TILE_SIZE:
+            self.vector.y = -sqrt(2 * GRAVITY * (self.rect.bottom - (y + 1) * TILE_SIZE + 16))
+
+    def update(self, tiles: set, platforms: set, player_rect: Rect, contraints: Group):
+        if not self.idling:
+            # random idle
+            if not self.chasing and randint(1, 50) == 1:
+                self.idling = True
+                self.update_action("idle")
+                self.idling_counter = randint(30, 70)
+        else:
+            self.idling_counter -= 1
+            if self.idling_counter <= 0:
+                self.stop_idling()
+        self.move(tiles, platforms, contraints)
+
         # update enemy vision
         self.vision_rect.midbottom = self.rect.midbottom
+        sees_player = self.vision_rect.colliderect(player_rect)
+        # once seen, the player is followed as long as there is a path to it (shared by all spiders going after it)
+        step = self.nav_graph.next_step(self.rect, player_rect) if sees_player or self.chasing else None
+        self.chasing = step is not None
+        if step is not None:
+            self.idling = False
+            self.update_action("run")
+            self.follow(step)
         # if enemy "sees" the player
-        if self.vision_rect.colliderect(player_rect):
+        elif sees_player:
             self.idling = False
+            self.climbing = False
             self.update_action("run")
             # change enemy direction to go after the player
             if player_rect.x < self.rect.x - 5:
@@ -657,6 +720,7 @@ class SpiderAdvanced(EnemyBase):
             else:
                 self.vector.x = 0
         elif self.vector.x == 0:
+            self.climbing = False
             self.vector.x = self.speed * choice((-1, 1))
         # TEMP: enemy vision
         # draw_rect(screen, GOLD, (self.vision_rect.left - scroll[0], self.vision_rect.top - scroll[1], self.vision_rect.width, self.vision_rect.height))
@@ -670,24 +734,17 @@ class SpiderAdvanced(EnemyBase):
         if self.frame_index >= len(self.animations[self.action]):
             self.frame_index = 0
         # set new frame to the image and flip it if necessary
-        self.image = flip(self.animations[self.action][floor(self.frame_index)], self.flip, False)
+        self.image = frame_variant(self.animations[self.action][floor(self.frame_index)], self.flip)
 
-        # blinking if damaged
+        # blinking if damaged (dimmed copy, frames are shared)
         if self.blinking:
             self.blinking -= 1
-            if sin(get_ticks()) >= 0:
-                self.image.set_alpha(255)
-            else:
-                self.image.set_alpha(63)
-        else:
-            self.image.set_alpha(255)
-
-        # draw enemy on the screen
-        self.draw(screen, scroll)
+            if sin(get_ticks()) < 0:
+                self.image = frame_variant(self.image, dimmed=True)
 
 
 class Bat(EnemyBase):
-    def __init__(self, position: tuple, images: tuple, gold_group: Group):
+    def __init__(self, position: tuple, images: tuple, gold_group: Group, flow_field: FlowField):
         super().__init__(position, 10, (1, 3), (4, 6), (0, 4), gold_group)
 
         self.animations = {"idle": images[0], "fly": images[1]}
@@ -699,17 +756,18 @@ class Bat(EnemyBase):
 
         self.vision_rect = Rect(0, 0, 640, 360)
         self.spotted_player = False
+        self.flow_field = flow_field  # shared by all bats, leads around walls to the player
 
         self.score_amount = 120
 
         self.move_count = 30
 
-    def check_horizontal_collisions(self, tiles: set):
-        for tile in tiles:
-            if tile.rect.colliderect(self.rect):
+    def check_horizontal_collisions(self, tile_rects: list):
+        for tile_rect in tile_rects:
+            if tile_rect.colliderect(self.rect):
                 # touching tile right wall
                 if self.vector.x < 0:
-                    self.rect.left = tile.rect.right
+                    self.rect.left = tile_rect.right
                     if not self.spotted_player:
                         random_angle = randint(-90, 90)
                         self.vector.x = round(self.speed * cos(radians(random_angle)))
@@ -717,19 +775,19 @@ class Bat(EnemyBase):
                     break
                 # touching tile left wall
                 elif self.vector.x > 0:
-                    self.rect.right = tile.rect.left
+                    self.rect.right = tile_rect.left
                     if not self.spotted_player:
                         random_angle = randint(90, 270)
                         self.vector.x = round(self.speed * cos(radians(random_angle)))
                         self.vector.y = round(self.speed * sin(radians(random_angle)))
                         break
 
-    def check_vertical_collisions(self, tiles: set):
-        for tile in tiles:
-            if tile.rect.colliderect(self.rect):
+    def check_vertical_collisions(self, tile_rects: list):
+        for tile_rect in tile_rects:
+            if tile_rect.colliderect(self.rect):
                 # touching floor
                 if self.vector.y > 0:
-                    self.rect.bottom = tile.rect.top
+                    self.rect.bottom = tile_rect.top
                     if not self.spotted_player:
                         random_angle = randint(180, 360)
                         self.vector.x = round(self.speed * cos(radians(random_angle)))
@@ -737,7 +795,7 @@ class Bat(EnemyBase):
                         break
                 # touching ceiling
                 elif self.vector.y < 0:
-                    self.rect.top = tile.rect.bottom
+                    self.rect.top = tile_rect.bottom
                     if not self.spotted_player:
                         random_angle = randint(0, 180)
                         self.vector.x = round(self.speed * cos(radians(random_angle)))
@@ -759,7 +817,18 @@ class Bat(EnemyBase):
             self.action = new_action
             self.frame_index = 0
 
-    def update(self, screen: Surface, scroll: list, tiles: set, platforms: set, player_rect: Rect, constraints: Group):
+    def stop_idling(self):
+        self.idling = False  # keeps the direction picked before idling
+
+    def move(self, tiles: set, platforms: set, constraints: Group):
+        # flying without gravity
+        if self.action == "fly" and not self.idling:
+            self.rect.x += self.vector.x
+            self.check_horizontal_collisions(self.flow_field.solid_rects(self.rect))
+            self.rect.y += self.vector.y
+            self.check_vertical_collisions(self.flow_field.solid_rects(self.rect))
+
+    def update(self, tiles: set, platforms: set, player_rect: Rect, constraints: Group):
         if self.action == "fly":
             if self.vector.x > 0:
                 self.flip = True
@@ -770,7 +839,7 @@ class Bat(EnemyBase):
             if self.frame_index >= len(self.animations[self.action]):
                 self.frame_index = 0
             # set new frame to the image and flip it if necessary
-            self.image = flip(self.animations[self.action][floor(self.frame_index)], self.flip, False)
+            self.image = frame_variant(self.animations[self.action][floor(self.frame_index)], self.flip)
 
             if self.move_count == 0:
                 random_angle = randint(1, 360)
@@ -783,43 +852,39 @@ class Bat(EnemyBase):
             if self.idling:
                 self.idling_counter -= 1
                 if self.idling_counter <= 0:
-                    self.idling = False
+                    self.stop_idling()
             else:
                 self.move_count -= 1   
                 # update x position and check for horizontal collisions
                 self.rect.x += self.vector.x
-                self.check_horizontal_collisions(tiles)
+                self.check_horizontal_collisions(self.flow_field.solid_rects(self.rect))
 
                 # update y position and check collisions with tiles
                 self.rect.y += self.vector.y
-                self.check_vertical_collisions(tiles)
+                self.check_vertical_collisions(self.flow_field.solid_rects(self.rect))
 
         # update enemy vision
         self.vision_rect.center = self.rect.center
-        # if enemy "sees" the player
-        if self.vision_rect.colliderect(player_rect):
+        # if enemy "sees" the player (once spotted, it follows the flow field even around walls)
+        if self.vision_rect.colliderect(player_rect) or (self.spotted_player and self.flow_field.distance(self.rect.center) > 0):
             self.update_action("fly")
             self.idling = False
             self.spotted_player = True
             self.move_count = 10
-            # change enemy direction to go after the player
-            x_distance = player_rect.centerx - self.rect.centerx
-            y_distance = player_rect.centery - self.rect.centery - 24
+            # go around walls to the next cell of the flow field, straight after the player when close
+            target = self.flow_field.next_cell_center(self.rect.center)
+            if target is None:
+                target = (player_rect.centerx, player_rect.centery - 24)
+            x_distance = target[0] - self.rect.centerx
+            y_distance = target[1] - self.rect.centery
             angle = atan2(y_distance, x_distance)
             self.vector.x = round(self.speed * cos(angle))
             self.vector.y = round(self.speed * sin(angle))
         else:
             self.spotted_player = False
             
-        # blinking if damaged
+        # blinking if damaged (dimmed copy, frames are shared)
         if self.blinking:
             self.blinking -= 1
-            if sin(get_ticks()) >= 0:
-                self.image.set_alpha(255)
-            else:
-                self.image.set_alpha(63)
-        else:
-            self.image.set_alpha(255)
-
-        # draw enemy on the screen
-        self.draw(screen, scroll)
+            if sin(get_ticks()) < 0:
+                self.image = frame_variant(self.image, dimmed=True)
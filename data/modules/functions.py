@@ -1,34 +1,82 @@
-from os import listdir
+from time import perf_counter
+from numpy import cumsum, pad, uint8
 from pygame.surface import Surface
-from pygame.time import Clock
-from .constants import BLACK, FPS, SCREEN_SIZE
-from pygame.display import update as update_display
-from pygame.image import load
-from pygame.transform import smoothscale, scale2x
+from pygame.surfarray import array3d, blit_array
+from pygame.transform import smoothscale
+
+from .assets import list_images
+from .atlas import atlas
 
 def load_images(path: str, filename: str, scale=1, start_counter=0) -> tuple:
+    # frames are packed into the shared atlas (loaded only once)
     frames = []
-    for i in range(start_counter, len(listdir(path)) + start_counter):
-        frame = load(f"{path}/{filename}{i}.png").convert_alpha()
-        if scale == 2:
-            frame = scale2x(frame)
-        elif scale != 1:
-            frame = smoothscale(frame, (frame.get_width() * scale, frame.get_height() * scale))
-        frames.append(frame)
+    for i in range(start_counter, len(list_images(path)) + start_counter):
+        frames.append(atlas.load(f"{path}/{filename}{i}.png", scale))
     return tuple(frames)
 
 
-def screen_fade(screen: Surface, clock: Clock, fading: bool):
-    screen_copy = screen.copy()
-    fade_surface = Surface(SCREEN_SIZE)
-    fade_surface.fill(BLACK)
-    if fading:
-        alphas = range(0, 257, 24)
+def box_blur(pixels, radius: int, axis: int):
+    # running sum over 2 * radius + 1 pixels along one axis
+    size = 2 * radius + 1
+    widths = [(0, 0)] * pixels.ndim
+    widths[axis] = (radius + 1, radius)
+    sums = cumsum(pad(pixels, widths, mode="edge"), axis=axis, dtype="uint32")
+    length = pixels.shape[axis]
+    upper = sums.take(range(size, size + length), axis=axis)
+    lower = sums.take(range(0, length), axis=axis)
+    return ((upper - lower) // size).astype(uint8)
+
+
+def blur_surface(surface: Surface, radius=2, downscale=4) -> Surface:
+    # blur at lower resolution (separable box blur) and scale back up
+    width, height = surface.get_size()
+    small = smoothscale(surface, (width // downscale, height // downscale))
+    pixels = box_blur(box_blur(array3d(small), radius, 0), radius, 1)
+    blit_array(small, pixels)
+    return smoothscale(small, (width, height))
+
+
+def draw_layer(screen: Surface, sprites, scroll: list):
+    # whole layer in one blits call instead of a draw call per sprite
+    scroll_x, scroll_y = scroll
+    screen.blits([(sprite.image, (sprite.rect.x - scroll_x, sprite.rect.y - scroll_y)) for sprite in sprites], False)
+
+
+def draw_lights(surface: Surface, light: Surface, centers, scroll: list):
+    # the same light image centered on every position, one blits call
+    offset_x = scroll[0] + light.get_width() // 2
+    offset_y = scroll[1] + light.get_height() // 2
+    surface.blits([(light, (x - offset_x, y - offset_y)) for x, y in centers], False)
+
+
+# benchmark of the pause menu blur: python -m data.modules.functions (from the game directory)
+if __name__ == "__main__":
+    from os import environ
+    from random import randint
+    from pygame import init
+    from pygame.display import set_mode
+    from pygame.image import fromstring, tostring
+
+    environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    init()
+    screen = set_mode((1280, 720))
+    for _ in range(2000):
+        screen.fill((randint(0, 255), randint(0, 255), randint(0, 255)), (randint(0, 1280), randint(0, 720), 64, 64))
+
+    start = perf_counter()
+    for _ in range(20):
+        blur_surface(screen)
+    print(f"blur_surface: {(perf_counter() - start) / 20 * 1000:.1f} ms")
+
+    try:
+        from PIL.Image import frombytes
+        from PIL.ImageFilter import GaussianBlur
+    except ImportError:
+        pass
     else:
-        alphas = range(256, -2, -24)
-    for alpha in alphas:
-        fade_surface.set_alpha(alpha)
-        screen.blit(screen_copy, (0, 0))
-        screen.blit(fade_surface, (0, 0))
-        update_display()
-        clock.tick(FPS)
+        start = perf_counter()
+        for _ in range(20):
+            str_surf = tostring(screen.copy(), "RGB", False)
+            blurred = frombytes("RGB", (1280, 720), str_surf).filter(GaussianBlur(5))
+            fromstring(blurred.tobytes("raw", "RGB"), (1280, 720), "RGB")
+        print(f"PIL GaussianBlur: {(perf_counter() - start) / 20 * 1000:.1f} ms")
@@ -0,0 +1,219 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from random import choice, choices, random, shuffle
+
+from numpy import ones, uint8, zeros
+
+from .cellular import generate_map
+from .constants import CHUNK_SIZE
+
+HANDMADE_LEVELS = 11  # levels deeper than this are generated
+BORDER = 4  # solid stone around generated caves (keeps the void off screen)
+JUMP_HEIGHT = 2  # tiles the player can safely jump up
+
+FLOOR_DECORATIONS = (1, 2, 3, 4, 5, 15, 16, 17, 18, 25)
+CEILING_DECORATIONS = {11: 1, 12: 1, 13: 1, 14: 2, 19: 3}  # decoration: tiles of free space below
+
+
+def level_size(depth: int) -> tuple:
+    # maps grow by one chunk every few levels, multiples of CHUNK_SIZE
+    growth = (depth - HANDMADE_LEVELS) // 4 * CHUNK_SIZE
+    return min(32 + growth, 96), min(56 + growth, 128)
+
+
+def fall(map_data, y: int, x: int) -> int:
+    # row where something falling from (y, x) lands (ladders can be grabbed)
+    while map_data[y][x] != 2 and map_data[y + 1][x] not in (1, 3):
+        y += 1
+    return y
+
+
+def is_standing(map_data, y: int, x: int) -> bool:
+    # player fits (two tiles high) and is supported by stone, platform or ladder
+    if map_data[y][x] == 1 or map_data[y - 1][x] == 1:
+        return False
+    return map_data[y][x] == 2 or map_data[y + 1][x] in (1, 3)
+
+
+def add_ladders_and_platforms(map_data):
+    # bridge every drop the player couldn't jump back up:
+    # one tile too high - platform, higher - ladder up to the ledge
+    height, width = map_data.shape
+    for y in range(1, height - 1):
+        for x in range(1, width - 1):
+            if map_data[y][x] != 0 or map_data[y - 1][x] == 1 or map_data[y + 1][x] != 1:
+                continue
+            for column in (x - 1, x + 1):
+                if map_data[y][column] != 0 or map_data[y + 1][column] != 0:
+                    continue
+                floor = fall(map_data, y + 1, column)
+                gap = floor - y
+                if gap <= JUMP_HEIGHT or map_data[floor][column] == 2:
+                    continue
+                if gap == JUMP_HEIGHT + 1:
+                    map_data[y + 2][column] = 3
+                elif not (map_data[y + 1:floor + 1, column - 1:column + 2] == 2).any():
+                    map_data[y + 1:floor + 1, column] = 2
+
+
+def find_reachable(map_data, start: tuple) -> dict:
+    # BFS over cells the player can stand in: walking, falling, jumping and climbing
+    parents = {start: None}
+    queue = deque([start])
+    while queue:
+        y, x = queue.popleft()
+        targets = []
+        for d in (-1, 1):
+            if map_data[y][x + d] != 1 and map_data[y - 1][x + d] != 1:
+                targets.append((fall(map_data, y, x + d), x + d))
+        for k in range(1, JUMP_HEIGHT + 1):
+            if y - k - 1 < 1 or map_data[y - k - 1][x] == 1:
+                break
+            for d in (-1, 0, 1):
+                if is_standing(map_data, y - k, x + d):
+                    targets.append((y - k, x + d))
+        if map_data[y][x] == 2 and map_data[y - 1][x] == 2:
+            targets.append((y - 1, x))
+        if map_data[y + 1][x] == 2:
+            targets.append((y + 1, x))
+        for target in targets:
+            if target not in parents and is_standing(map_data, *target):
+                parents[target] = (y, x)
+                queue.append(target)
+    return parents
+
+
+def spaced_sample(cells: list, amount: int, spacing: int) -> list:
+    # random cells at least `spacing` tiles apart from each other
+    shuffle(cells)
+    selected = []
+    for y, x in cells:
+        if len(selected) >= amount:
+            break
+        if all(abs(y - sy) > spacing or abs(x - sx) > spacing for sy, sx in selected):
+            selected.append((y, x))
+    return selected
+
+
+def generate_level(depth: int) -> tuple:
+    # caves too small (no room for both doors or for all enemies of the depth) are generated again
+    level = None
+    while level is None:
+        level = build_level(depth)
+    return level
+
+
+def build_level(depth: int):
+    # map, decorations, enemies and doors of a level, None if the cave is too small
+    height, width = level_size(depth)
+
+    # caves from cellular automata, surrounded with stone
+    map_data = ones((height, width), dtype=uint8)
+    map_data[BORDER:-BORDER, BORDER:-BORDER] = generate_map(height - 2 * BORDER, width - 2 * BORDER)
+    add_ladders_and_platforms(map_data)
+
+    floors = {(y, x) for y in range(1, height - 1) for x in range(1, width - 1)
+              if map_data[y][x] == 0 and map_data[y - 1][x] == 0 and map_data[y + 1][x] == 1}
+
+    # doors - entrance with the most of the cave reachable from it,
+    # exit as far as possible (in steps) from the entrance
+    entrance, reachable = None, {}
+    for entrance_candidate in spaced_sample(list(floors), 5, 8):
+        candidate_reachable = find_reachable(map_data, entrance_candidate)
+        if len(candidate_reachable) > len(reachable):
+            entrance, reachable = entrance_candidate, candidate_reachable
+    reachable_floors = [cell for cell in reachable if cell in floors]
+    if len(reachable_floors) < 2:
+        return None  # no floor or only one reachable floor cell
+    exit = reachable_floors[-1]  # BFS order - the last one is the farthest (the entrance is the first one)
+    map_data[entrance] = 4
+    map_data[exit] = 4
+    doors = {f"{entrance[1]};{entrance[0]}": "player", f"{exit[1]};{exit[0]}": f"level_{depth + 1}"}
+
+    # cells on the way from the entrance to the exit stay lava free
+    path = set()
+    cell = exit
+    while cell is not None:
+        path.add(cell)
+        cell = reachable[cell]
+
+    def near_door(y: int, x: int, distance: int) -> bool:
+        return any(abs(y - dy) <= distance and abs(x - dx) <= distance for dy, dx in (entrance, exit))
+
+    free_floors = [(y, x) for y, x in reachable_floors if not near_door(y, x, 1)]
+
+    # torches
+    for y, x in spaced_sample(free_floors[:], len(free_floors) // 12, 5):
+        map_data[y][x] = 5
+
+    # lava - fill pits closed with stone on both sides, more often deeper
+    lava_chance = min(0.1 + 0.05 * (depth - HANDMADE_LEVELS), 0.6)
+    for y in range(1, height - 1):
+        x = 1
+        while x < width - 1:
+            start = x
+            while map_data[y][x] == 0 and map_data[y + 1][x] == 1:
+                x += 1
+            pit = [(y, column) for column in range(start, x)]
+            if pit and map_data[y][start - 1] == 1 and map_data[y][x] == 1 and len(pit) <= 8:
+                if not any(cell in path or near_door(*cell, 2) for cell in pit) and random() < lava_chance:
+                    for cell in pit:
+                        map_data[cell] = 9
+            x += 1
+
+    # decorations
+    decorations_data = zeros((height, width), dtype=uint8)
+    for y in range(1, height - 1):
+        for x in range(1, width - 1):
+            if random() > 0.12:
+                continue
+            if map_data[y][x] == 0 and map_data[y + 1][x] == 1:
+                decorations_data[y][x] = choice(FLOOR_DECORATIONS)
+            elif map_data[y][x] == 0 and map_data[y - 1][x] == 1:
+                decoration = choice(tuple(CEILING_DECORATIONS))
+                if (map_data[y:y + CEILING_DECORATIONS[decoration] + 1, x] == 0).all():
+                    decorations_data[y][x] = decoration
+
+    # enemies - more of them and nastier ones deeper
+    enemies_data = zeros((height, width), dtype=uint8)
+    deeper = depth - HANDMADE_LEVELS
+    weights = (4, 3, 1 + deeper / 2, 1 + deeper / 2)  # slime, spider, advanced spider, bat
+    spawns = [(y, x) for y, x in reachable if map_data[y][x] in (0, 5) and not near_door(y, x, 8)]
+    amount = min(12 + 2 * deeper, 60)
+    # spread out if possible, closer to each other in smaller caves
+    for spacing in (2, 1, 0):
+        selected = spaced_sample(spawns, amount, spacing)
+        if len(selected) == amount:
+            break
+    else:
+        return None  # not enough room even without spacing
+    for y, x in selected:
+        enemies_data[y][x] = choices((1, 2, 3, 4), weights)[0]
+
+    return map_data, decorations_data, enemies_data, doors
+
+
+# one background worker shared by every game, generating the next depth while the current one is played
+executor = ThreadPoolExecutor(max_workers=1)
+
+
+class LevelGenerator:
+    def __init__(self):
+        self.levels = {}
+
+    def prepare(self, depth: int):
+        if depth not in self.levels:
+            self.levels[depth] = executor.submit(generate_level, depth)
+
+    def take(self, depth: int):
+        # future of the level (main thread only - levels isn't shared with workers)
+        self.prepare(depth)
+        return self.levels.pop(depth)
+
+    def put_back(self, depth: int, future):
+        # level taken but not used (its reading was cancelled)
+        self.levels.setdefault(depth, future)
+
+    def get(self, depth: int) -> tuple:
+        # blocks only if the worker hasn't finished yet
+        return self.take(depth).result()
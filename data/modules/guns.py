@@ -1,11 +1,10 @@
 from random import randint, random
 from pygame import Vector2
 
-from pygame.image import load
 from pygame.rect import Rect
 from pygame.sprite import Group
-from pygame.transform import scale2x
 
+from .atlas import atlas
 from .classes import Bullet
 
 
@@ -17,7 +16,7 @@ class Shotgun:
 
         self.bullet_group = bullet_group
         self.player_vector = player_vector
-        self.bullet_img = load("data/img/bullet.png").convert_alpha()
+        self.bullet_img = atlas.load("data/img/bullet.png")
 
     def shoot(self, player_rect: Rect, player_flip: bool, key_up: bool, key_down: bool):
         if self.cooldown <= 0:
@@ -64,7 +63,7 @@ class Handgun:
 
         self.bullet_group = bullet_group
         self.player_vector = player_vector
-        self.bullet_img = load("data/img/bullet.png").convert_alpha()
+        self.bullet_img = atlas.load("data/img/bullet.png")
 
     def shoot(self, player_rect: Rect, player_flip: bool, key_up: bool, key_down: bool):
         if self.cooldown <= 0:
@@ -98,8 +97,8 @@ class BigShot:
 
         self.bullet_group = bullet_group
         self.player_vector = player_vector
-        self.bullet_img = load("data/img/bullet.png").convert_alpha()
-        self.bullet_img2 = scale2x(load("data/img/bullet.png").convert_alpha())
+        self.bullet_img = atlas.load("data/img/bullet.png")
+        self.bullet_img2 = atlas.load("data/img/bullet.png", 2)
 
     def shoot(self, player_rect: Rect, player_flip: bool, key_up: bool, key_down: bool):
         if self.cooldown <= 0:
@@ -133,7 +132,7 @@ class Minigun:
 
         self.bullet_group = bullet_group
         self.player_vector = player_vector
-        self.bullet_img = load("data/img/bullet.png").convert_alpha()
+        self.bullet_img = atlas.load("data/img/bullet.png")
 
     def shoot(self, player_rect: Rect, player_flip: bool, key_up: bool, key_down: bool):
         if self.cooldown <= 0:
@@ -0,0 +1,54 @@
+from sqlite3 import connect
+
+
+class RunHistory:
+    def __init__(self, path: str):
+        # every finished run is appended, nothing is ever rewritten
+        self.connection = connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS runs ("
+                "id INTEGER PRIMARY KEY, score INTEGER NOT NULL, depth INTEGER, kills INTEGER, "
+                "gold INTEGER, gun TEXT, duration REAL, finished TEXT DEFAULT CURRENT_TIMESTAMP)"
+            )
+            self.connection.execute("CREATE INDEX IF NOT EXISTS runs_score ON runs (score DESC)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS runs_gun_score ON runs (gun, score DESC)")
+            # one-time imports already done (in the same transaction as the imported runs)
+            self.connection.execute("CREATE TABLE IF NOT EXISTS imports (name TEXT PRIMARY KEY)")
+
+    def add_run(self, score: int, depth: int, kills: int, gold: int, gun: str, duration: float):
+        with self.connection:
+            self.connection.execute(
+                "INSERT INTO runs (score, depth, kills, gold, gun, duration) VALUES (?, ?, ?, ?, ?, ?)",
+                (score, depth, kills, gold, gun, duration)
+            )
+
+    def import_highscores(self, save_data: dict) -> bool:
+        # scores kept in save.json by older versions (other stats unknown), imported only once
+        # even if save.json without them wasn't written - True if save_data changed
+        if "highscores" not in save_data:
+            return False
+        with self.connection:
+            if self.connection.execute("SELECT 1 FROM imports WHERE name = 'highscores'").fetchone() is None:
+                self.connection.executemany("INSERT INTO runs (score) VALUES (?)",
+                                            [(score, ) for score in save_data["highscores"]])
+                self.connection.execute("INSERT INTO imports (name) VALUES ('highscores')")
+        del save_data["highscores"]
+        return True
+
+    def top_scores(self, amount: int) -> list:
+        return [score for score, in self.connection.execute(
+            "SELECT score FROM runs ORDER BY score DESC LIMIT ?", (amount, )
+        )]
+
+    def gun_stats(self) -> list:
+        # (gun, runs, best score) for every gun used at least once
+        return self.connection.execute(
+            "SELECT gun, COUNT(*), MAX(score) FROM runs WHERE gun IS NOT NULL GROUP BY gun ORDER BY gun"
+        ).fetchall()
+
+    def clear(self):
+        with self.connection:
+            self.connection.execute("DELETE FROM runs")
@@ -1,35 +1,67 @@
-from json import dump as dump_to_json
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from json import load as load_json
 from random import choice, randint
 
-from numpy import loadtxt, uint8
-from pygame.font import Font
-from pygame.image import load as load_image
-from pygame.locals import BLEND_RGBA_MULT
+from numpy import isin, loadtxt, nonzero, uint8, zeros
+from pygame.locals import BLEND_MULT
 from pygame.rect import Rect
 from pygame.sprite import Group
 from pygame.surface import Surface
-from pygame.time import Clock
-from pygame.transform import scale2x
+from pygame.time import Clock, get_ticks
+from pygame.transform import scale, scale2x
 
-from .classes import HealthBar, ManaBar
-from .constants import BLACK, CHUNK_SIZE, DARK_GRAY, SCREEN_SIZE, TILE_SIZE, WHITE
+from .classes import HealthBar, ManaBar, ScreenFade
+from .constants import (BLACK, CHUNK_CACHE_SIZE, CHUNK_SIZE, DARK_GRAY, SCREEN_SIZE, SIMULATION_MARGIN,
+                        SLEEP_ENEMIES, TILE_SIZE, VECTORIZED_ENEMIES, WHITE)
 from .entities import Bat, Player, Slime, Spider, SpiderAdvanced
-from .functions import load_images, screen_fade
-from .tiles import Door, Lava, LavaTile, Tile, Torch, Upgrade, Platform
+from .assets import load_font, load_image
+from .atlas import atlas, prepare_image
+from .functions import draw_layer, draw_lights, load_images
+from .generator import HANDMADE_LEVELS, LevelGenerator
+from .history import RunHistory
+from .navigation import FlowField, NavGraph
+from .quality import QualityGovernor
+from .render import RenderQueue
+from .saves import SaveFile
+from .scheduler import EnemyScheduler
+from .simulation import GroundSimulation
+from .tiles import Animation, Door, Lava, LavaTile, Tile, Torch, Upgrade, Platform
+
+
+# tiles (left, top, right, bottom) by which images of the layer stick out of their own tile
+# (wide and tall decorations, torches drawn half a tile higher)
+LAYER_OVERHANG = {"decorations": (1, 2, 0, 0), "torches": (0, 0, 0, 1)}
+# one background worker shared by every game, reading the levels behind the doors
+loader = ThreadPoolExecutor(max_workers=1)
+
+
+def active_area(viewport: Rect) -> Rect:
+    # enemies, bullets and gold are updated a bit outside of the screen,
+    # tiles are collected with some more space for whatever stands on the edge
+    return viewport.inflate(2 * SIMULATION_MARGIN, 2 * SIMULATION_MARGIN)
+
+
+def chunk_range(rect: Rect, size: tuple) -> tuple:
+    # chunks (first_x, first_y, last_x, last_y) intersecting rect, last ones excluded
+    chunk_pixels = CHUNK_SIZE * TILE_SIZE
+    return (max(rect.left // chunk_pixels, 0), max(rect.top // chunk_pixels, 0),
+            min(-(-rect.right // chunk_pixels), size[0]), min(-(-rect.bottom // chunk_pixels), size[1]))
 
 
 class Level:
-    def __init__(self, screen: Surface, clock: Clock, save_data: dict):
+    def __init__(self, screen: Surface, clock: Clock, save_data: dict, save_file: SaveFile, run_history: RunHistory):
         self.screen = screen
         self.clock = clock
 
         # game elements containers - objects/groups/sets
         self.player = None
-        self.game_map = {}
+        self.game_map = OrderedDict()  # built chunks, least recently used first
         self.torch_particles = set()
         self.bullet_group = Group()
-        self.enemies = Group()
+        self.enemies = Group()  # only enemies near the player
+        self.enemy_spawns = {}  # (chunk_x, chunk_y): enemies not created yet
+        self.sleeping_enemies = {}  # (chunk_x, chunk_y): enemies taken out of the group while far away
         self.texts = Group()
         self.gold_group = Group()
         self.doors = Group()
@@ -37,7 +69,12 @@ class Level:
         self.constraints = []
 
         self.save_data = save_data
+        self.save_file = save_file
+        self.run_history = run_history
+        self.highscores_texts = []
         self.score = 0
+        self.kills = 0
+        self.start_ticks = get_ticks()
         self.current_map = "level_0"  # entrance level
         self.next_map = ""
         self.current_level = 0
@@ -46,6 +83,7 @@ class Level:
         # scrolling
         self.true_scroll = [0, 0]
         self.scroll = [0, 0]
+        self.previous_scroll = [0, 0]
 
         # pressed keys (looking around)
         self.key_up = False
@@ -55,6 +93,13 @@ class Level:
         with open("data/maps/entrances_data.json", "r") as f:
             self.doors_data = load_json(f)
 
+        # endless mode - levels deeper than hand-made ones are generated in background
+        self.generator = LevelGenerator()
+
+        # levels behind the doors are read in background, ready before going through the door
+        self.prefetched = {}  # name: (future of read_level, future of the generated map or None)
+        self.level_data = None
+
         # load upgrades data
         with open("upgrades.json", "r") as f:
             self.upgrades_data = load_json(f)
@@ -64,24 +109,51 @@ class Level:
         self.mana_bar = ManaBar()
 
         # font
-        self.font = Font("data/fonts/Pixellari.ttf", 32)
-        self.small_font = Font("data/fonts/Pixellari.ttf", 24)
+        self.font = load_font("data/fonts/Pixellari.ttf", 32)
+        self.small_font = load_font("data/fonts/Pixellari.ttf", 24)
 
         # earthquake
         self.screen_shake = 0
 
+        # optional effects given up when frames are too slow (frame time is reported by the game loop)
+        self.quality = QualityGovernor()
+        self.enemy_scheduler = EnemyScheduler()
+        self.ground_simulation = GroundSimulation() if VECTORIZED_ENEMIES else None
+        self.flow_field = FlowField()  # bats find their way to the player
+        self.nav_graph = None  # advanced spiders follow the player over platforms and ladders
+
+        # draw commands of the current frame
+        self.render_queue = RenderQueue()
+        self.gold_text = (None, None)  # gold amount, its text
+        self.price_texts = {}  # price: its text (shop upgrades), rendered once
+        # internal resolution (quality.render_scale) - frame is drawn on the canvas and scaled to the screen
+        self.canvas = None
+        # static world kept between frames and moved with the camera,
+        # set to None to draw it directly every frame
+        self.static_buffer = Surface(SCREEN_SIZE)
+        self.static_scroll = None  # scroll the buffer was drawn with (None - redraw it whole)
+        self.objects = None
+        self.viewport = None
+        self.active_rect = None
+
+        # door transition - fade out (frozen frame), change level, fade in
+        self.transition = None
+        self.transition_snapshot = None
+        self.transition_coords = None
+
         # darkness
         self.darkness = True
-        self.player_light = load_image("data/img/lights/player_light.png").convert_alpha()
-        self.torch_light = load_image("data/img/lights/torch_light.png").convert_alpha()
-        self.torch_particle_light = load_image("data/img/lights/torch_particle_light.png").convert_alpha()
-        self.bullet_light = load_image("data/img/lights/bullet_light.png").convert_alpha()
-        self.lava_light = load_image("data/img/lights/lava_light.png").convert_alpha()
+        self.darkness_surface = Surface(SCREEN_SIZE)
+        self.player_light = prepare_image(load_image("data/img/lights/player_light.png"))
+        self.torch_light = prepare_image(load_image("data/img/lights/torch_light.png"))
+        self.torch_particle_light = prepare_image(load_image("data/img/lights/torch_particle_light.png"))
+        self.bullet_light = prepare_image(load_image("data/img/lights/bullet_light.png"))
+        self.lava_light = prepare_image(load_image("data/img/lights/lava_light.png"))
 
         # upgrades images
         self.upgrades_imgs = {}
         for image_name in self.upgrades_data.keys():
-            image = load_image(f"data/img/upgrades/{image_name}.png").convert()
+            image = prepare_image(load_image(f"data/img/upgrades/{image_name}.png"))
             self.upgrades_imgs[image_name] = image
 
         self.randomized_upgrades = []
@@ -94,40 +166,48 @@ class Level:
         self.score = 0
 
         # load level - create game map with chunks
+        self.load_images()
         self.load_level()
 
-    def load_level(self, very_important_variable=None):
-        # loop levels
-        if self.current_map == "level_12":
-            self.current_map = "level_1"
-
-        # images
-        stone_img = load_image("data/img/stone.png").convert()
-        bg_stone_img = scale2x(scale2x(load_image("data/img/background_stone.png").convert()))
-        ladder_img = load_image("data/img/ladder.png").convert_alpha()
-        platforms_imgs = load_images("data/img/platforms/", "platform_", 1, 1)
-        torch_imgs = load_images("data/img/torch", "torch_", 1, 1)
-        player_images = (load_images("data/img/player/idle", "idle_", 1, 1), load_images("data/img/player/run", "run_", 1, 1), load_images("data/img/player/climb", "climb_", 1, 1), load_image("data/img/player/jump.png").convert_alpha())
-        small_spider_imgs = (load_images("data/img/spider_small/idle", "spider_i_", 2, 1), load_images("data/img/spider_small/run", "spider_r_", 2, 1))
-        big_spider_imgs = (load_images("data/img/spider_big/idle", "spider_", 1, 1), load_images("data/img/spider_big/run", "spider_", 1, 1))
-        slimes_imgs = tuple([load_images(f"data/img/slimes/{color}", "slime_", 1, 1) for color in ("black", "blue", "green", "red", "yellow")])
-        bat_imgs = ((load_image("data/img/bat.png").convert_alpha(), ), load_images("data/img/bat", "bat_", 1, 1))
-        lava_imgs = load_images("data/img/lava", "Lava_", 1, 1)
-        lava_img = load_image("data/img/lava.png").convert()
-        doors = {4: load_image("data/img/doors/4.png").convert_alpha(), 6: load_image("data/img/doors/6.png").convert_alpha(),
-                 7: load_image("data/img/doors/7.png").convert_alpha(), 8: load_image("data/img/doors/8.png").convert_alpha()}
-        decorations_imgs = load_images("data/img/decorations", "Deco_", 1, 1)
-
-        # load map and decorations
-        map_data = loadtxt(f"data/maps/{self.current_map}.csv", dtype=uint8, delimiter=',')
-        decorations_data = loadtxt(f"data/maps/{self.current_map}_decorations.csv", dtype=uint8, delimiter=',')
-        if self.current_map not in ("level_0", "highscores", "achievements", "shop"):
-            enemies_data = loadtxt(f"data/maps/{self.current_map}_enemies.csv", dtype=uint8, delimiter=',')
+    def load_images(self):
+        # images shared by every level, loaded once
+        self.tile_images = {
+            "stone": prepare_image(load_image("data/img/stone.png")),
+            "bg_stone": prepare_image(scale2x(scale2x(load_image("data/img/background_stone.png")))),
+            "ladder": atlas.load("data/img/ladder.png"),
+            "platforms": load_images("data/img/platforms/", "platform_", 1, 1),
+            "torch": load_images("data/img/torch", "torch_", 1, 1),
+            "lava": load_images("data/img/lava", "Lava_", 1, 1),
+            "lava_tile": prepare_image(load_image("data/img/lava.png")),
+            "decorations": load_images("data/img/decorations", "Deco_", 1, 1)
+        }
+        self.animations = {"torch": Animation(self.tile_images["torch"], 0.25), "lava": Animation(self.tile_images["lava"], 0.1)}
+        self.player_images = (load_images("data/img/player/idle", "idle_", 1.5, 1), load_images("data/img/player/run", "run_", 1.5, 1), load_images("data/img/player/climb", "climb_", 1, 1), atlas.load("data/img/player/jump.png", 1.5))
+        self.small_spider_imgs = (load_images("data/img/spider_small/idle", "spider_i_", 2, 1), load_images("data/img/spider_small/run", "spider_r_", 2, 1))
+        self.big_spider_imgs = (load_images("data/img/spider_big/idle", "spider_", 1, 1), load_images("data/img/spider_big/run", "spider_", 1, 1))
+        self.slimes_imgs = tuple([load_images(f"data/img/slimes/{color}", "slime_", 1, 1) for color in ("black", "blue", "green", "red", "yellow")])
+        self.bat_imgs = ((atlas.load("data/img/bat.png"), ), load_images("data/img/bat", "bat_", 1, 1))
+        self.doors_imgs = {door: atlas.load(f"data/img/doors/{door}.png") for door in (4, 6, 7, 8)}
+
+    def read_level(self, name: str, generated=None) -> dict:
+        # read map layers and build chunks around doors (spawn points),
+        # doesn't touch any groups so it can run on the prefetch worker
+        # (with the future of a generated level taken from the generator on the main thread)
+        if "level_" in name and int(name[6:]) > HANDMADE_LEVELS:
+            if generated is None:
+                generated = self.generator.take(int(name[6:]))
+            map_data, decorations_data, enemies_data, doors_data = generated.result()
         else:
-            enemies_data = []
+            map_data = loadtxt(f"data/maps/{name}.csv", dtype=uint8, delimiter=',')
+            decorations_data = loadtxt(f"data/maps/{name}_decorations.csv", dtype=uint8, delimiter=',')
+            if name not in ("level_0", "highscores", "achievements", "shop"):
+                enemies_data = loadtxt(f"data/maps/{name}_enemies.csv", dtype=uint8, delimiter=',')
+            else:
+                enemies_data = zeros(map_data.shape, dtype=uint8)
+            doors_data = self.doors_data[name]
 
         # update level_0
-        if self.current_map == "level_0":
+        if name == "level_0":
             # highscores door
             if self.save_data["deaths"] > 0:
                 map_data[16][16] = 6
@@ -149,13 +229,102 @@ class Level:
                 map_data[14][24] = 5
                 map_data[15][21] = 5
 
-        # create empty chunks structure
-        # length and width of map must be a multiple of 8
-        for y in range(len(map_data) // CHUNK_SIZE):
-            for x in range(len(map_data[0]) // CHUNK_SIZE):
-                self.game_map[f"{x};{y}"] = {"tiles": set(), "ladders": set(), "platforms": set(),
-                                             "torches": set(), "lava": set(), "animated_tiles": set(),
-                                             "bg_tiles": set(), "decorations": set(), "collidable": set()}
+        # stone tiles with at least one non-stone neighbour are collidable
+        # (stone on the edges of the map isn't created at all)
+        stone = map_data == 1
+        surrounded = stone[1:-1, 1:-1].copy()
+        for i in range(3):
+            for j in range(3):
+                surrounded &= stone[i:len(map_data) - 2 + i, j:len(map_data[0]) - 2 + j]
+        collidable_data = zeros(map_data.shape, dtype=bool)
+        collidable_data[1:-1, 1:-1] = stone[1:-1, 1:-1] & ~surrounded
+
+        # tiles of every drawn layer (the same cells build_chunk creates sprites for)
+        interior = zeros(map_data.shape, dtype=bool)
+        interior[1:-1, 1:-1] = True
+        layers = {"bg_tiles": map_data != 1, "tiles": stone & interior & ~collidable_data, "collidable": collidable_data,
+                  "ladders": map_data == 2, "platforms": isin(map_data, (3, 12, 13, 14)), "torches": map_data == 5,
+                  "lava": isin(map_data, (9, 10)), "decorations": decorations_data != 0}
+
+        # enemies by chunk - (x, y, type), created when the chunk gets near the player
+        spawns = {}
+        constraints = []
+        for y, x in zip(*nonzero(enemies_data)):
+            y, x = int(y), int(x)
+            if enemies_data[y][x] == 5:
+                constraints.append(Rect(x * TILE_SIZE, y * TILE_SIZE, TILE_SIZE, TILE_SIZE))
+            else:
+                spawns.setdefault((x // CHUNK_SIZE, y // CHUNK_SIZE), []).append((x, y, int(enemies_data[y][x])))
+
+        level_data = {"name": name, "map": map_data, "decorations": decorations_data, "spawns": spawns,
+                      "constraints": constraints, "constraint_cells": enemies_data == 5, "doors": doors_data, "collidable": collidable_data, "layers": layers,
+                      "navigation": NavGraph(map_data), "chunks": {},
+                      "size": (len(map_data[0]) // CHUNK_SIZE, len(map_data) // CHUNK_SIZE)}
+
+        # chunks active right after spawning next to any of the doors
+        for y, x in zip(*nonzero(isin(map_data, (4, 6, 7, 8)))):
+            viewport = Rect(0, 0, *SCREEN_SIZE)
+            viewport.center = (int(x) * TILE_SIZE + 22, int(y) * TILE_SIZE + 32)
+            first_x, first_y, last_x, last_y = chunk_range(active_area(viewport), level_data["size"])
+            for chunk_y in range(first_y, last_y):
+                for chunk_x in range(first_x, last_x):
+                    if f"{chunk_x};{chunk_y}" not in level_data["chunks"]:
+                        level_data["chunks"][f"{chunk_x};{chunk_y}"] = self.build_chunk(chunk_x, chunk_y, level_data)
+
+        return level_data
+
+    def get_destination(self, leads_to: str) -> str:
+        # map loaded after going through the door (same rules as in run)
+        if self.current_map in ("highscores", "achievements"):
+            return "level_0"
+        if "level_" in leads_to and int(leads_to[6:]) > 1:
+            return "shop"
+        if "next" in leads_to:
+            return self.next_map
+        return leads_to
+
+    def prefetch_level(self, name: str):
+        # level_0 isn't prefetched - its doors depend on the stats when it's entered, not now
+        if name in self.prefetched or name == "level_0":
+            return
+        generated = None
+        if "level_" in name and int(name[6:]) > HANDMADE_LEVELS:
+            generated = self.generator.take(int(name[6:]))
+        self.prefetched[name] = (loader.submit(self.read_level, name, generated), generated)
+
+    def cancel_prefetching(self):
+        # levels not read yet are dropped (another level was entered or the game ended),
+        # their generated maps stay ready for later
+        for name, (future, generated) in self.prefetched.items():
+            if future.cancel() and generated is not None:
+                self.generator.put_back(int(name[6:]), generated)
+        self.prefetched.clear()
+
+    def load_level(self, very_important_variable=None):
+        # use level prepared in background if possible
+        if self.current_map in self.prefetched:
+            level_data = self.prefetched.pop(self.current_map)[0].result()
+        else:
+            level_data = self.read_level(self.current_map)
+        self.cancel_prefetching()
+
+        # start generating the next level while this one is played
+        if "level_" in self.current_map and int(self.current_map[6:]) + 1 > HANDMADE_LEVELS:
+            self.generator.prepare(int(self.current_map[6:]) + 1)
+
+        # chunks not built yet are created lazily (see get_chunk)
+        self.level_data = level_data
+        self.doors_data[self.current_map] = level_data["doors"]
+        self.game_map.update(level_data["chunks"])
+        map_data = level_data["map"]
+        self.enemy_spawns = dict(level_data["spawns"])
+        self.constraints.extend(level_data["constraints"])
+        if self.ground_simulation is not None:
+            self.ground_simulation.set_level(level_data)
+        self.flow_field.set_level(map_data)
+        self.nav_graph = level_data["navigation"]
+        doors = self.doors_imgs
+        player_images = self.player_images
 
         # shop-only
         if self.current_map == "shop":
@@ -166,102 +335,153 @@ class Level:
                     self.randomized_upgrades.append(selected)
             self.randomized_upgrades.append("Healing")
 
-        # load level data
-        for y, row in enumerate(map_data):
-            current_chunk_y = y // CHUNK_SIZE
-            for x, cell in enumerate(row):
-                current_chunk_x = x // CHUNK_SIZE
-                current_chunk = f"{current_chunk_x};{current_chunk_y}"  # calculate coordinates of chunk
+        # load level data - doors, player and upgrades (everything else lives in chunks)
+        for y, x in zip(*nonzero(isin(map_data, (4, 6, 7, 8, 11)))):
+            y, x = int(y), int(x)
+            cell = map_data[y][x]
+            # create doors
+            if cell in (4, 6):
+                image_rect = doors[cell].get_rect(midbottom=(x * TILE_SIZE + TILE_SIZE // 2, y * TILE_SIZE + TILE_SIZE))
+                if self.doors_data[self.current_map][f"{x};{y}"] == "player":
+                    self.doors.add(Door((image_rect.x, image_rect.y), doors[cell], None, False))
+                    self.player = Player((x * TILE_SIZE + TILE_SIZE // 2, y * TILE_SIZE + TILE_SIZE), player_images, self.selected_gun, self.enemies, self.gold_group, self.bullet_group, self.texts, self.bought_upgrades, self.player_gold, self.player_health, self.player_max_health)
+                else:
+                    self.doors.add(Door((image_rect.x, image_rect.y), doors[cell], self.doors_data[self.current_map][f"{x};{y}"], True))
+            elif cell in (7, 8):
+                image_rect = doors[cell].get_rect(midbottom=(x * TILE_SIZE + TILE_SIZE // 2, y * TILE_SIZE + TILE_SIZE))
+                self.doors.add(Door((image_rect.x, image_rect.y), doors[cell], self.doors_data[self.current_map][f"{x};{y}"], False))
+            # create upgrade icons
+            elif cell == 11:
+                name = self.randomized_upgrades.pop()
+                self.shop_upgrades.add(Upgrade((x * TILE_SIZE + 8, y * TILE_SIZE + 8), self.upgrades_imgs[name], name))
+
+        # highscores room - query run history once per visit
+        if self.current_map == "highscores":
+            self.highscores_texts = [(self.font.render("Highscores", False, WHITE), (8 * TILE_SIZE + 32, 8 * TILE_SIZE))]
+            for i, score in enumerate(self.run_history.top_scores(5)):
+                self.highscores_texts.append((self.font.render(f"{i + 1}. {score}", False, WHITE), (13 * TILE_SIZE, 7 * TILE_SIZE - 32 + i * 40)))
+            for i, (gun, runs, best) in enumerate(self.run_history.gun_stats()):
+                self.highscores_texts.append((self.small_font.render(f"{gun}: {best} ({runs} runs)", False, DARK_GRAY), (8 * TILE_SIZE + 32, 6 * TILE_SIZE + 16 + i * 24)))
 
-                # create stone tiles and add them to chunks
+        # prefetch levels behind the doors
+        for door in self.doors:
+            if door.allowed:
+                self.prefetch_level(self.get_destination(door.leads_to))
+
+        # positions in main rooms
+        if len(self.doors) == 1:  # achievements/highscores
+            door_pos = self.doors.sprites()[0].rect
+            self.player = Player(door_pos.midbottom, player_images, self.selected_gun, self.enemies, self.gold_group, self.bullet_group, self.texts, self.bought_upgrades, self.player_gold, self.player_health, self.player_max_health)
+        elif very_important_variable is not None:
+            self.player = Player((very_important_variable[0] * TILE_SIZE + TILE_SIZE // 2, very_important_variable[1] * TILE_SIZE + TILE_SIZE), player_images, self.selected_gun, self.enemies, self.gold_group, self.bullet_group, self.texts, self.bought_upgrades, self.player_gold, self.player_health, self.player_max_health)
+        
+        # center scroll to the player
+        self.true_scroll[0] += (self.player.rect.x - self.true_scroll[0] - self.screen.get_width() // 2 + 22)
+        self.true_scroll[1] += (self.player.rect.y - self.true_scroll[1] - self.screen.get_height() // 2 + 32)
+        self.scroll[0] = int(self.true_scroll[0])
+        self.scroll[1] = int(self.true_scroll[1])
+        self.previous_scroll = self.scroll.copy()
+
+    def build_chunk(self, chunk_x: int, chunk_y: int, level_data: dict) -> dict:
+        # every layer - (x, y) of the tile: sprite
+        chunk = {"tiles": {}, "ladders": {}, "platforms": {},
+                 "torches": {}, "lava": {},
+                 "bg_tiles": {}, "decorations": {}, "collidable": {}}
+        images = self.tile_images
+        map_data = level_data["map"]
+
+        for y in range(chunk_y * CHUNK_SIZE, (chunk_y + 1) * CHUNK_SIZE):
+            for x in range(chunk_x * CHUNK_SIZE, (chunk_x + 1) * CHUNK_SIZE):
+                cell = map_data[y][x]
+                position = (x * TILE_SIZE, y * TILE_SIZE)
+
+                # create stone tiles
                 if cell == 1:
                     if y > 0 and x > 0 and y < len(map_data) - 1 and x < len(map_data[0]) - 1:
-                        collidable = False
-                        for i in range(-1, 2):
-                            for j in range(-1, 2):
-                                if i == 0 and j == 0:
-                                    pass
-                                else:
-                                    if map_data[y + i][x + j] != 1:
-                                        collidable = True
-                                        break
-                        if collidable:
-                            self.game_map[current_chunk]["collidable"].add(Tile((x * TILE_SIZE, y * TILE_SIZE), stone_img))
+                        if level_data["collidable"][y][x]:
+                            chunk["collidable"][(x, y)] = Tile(position, images["stone"])
                         else:
-                            self.game_map[current_chunk]["tiles"].add(Tile((x * TILE_SIZE, y * TILE_SIZE), stone_img))
+                            chunk["tiles"][(x, y)] = Tile(position, images["stone"])
                 # create ladders
                 elif cell == 2:
-                    self.game_map[current_chunk]["ladders"].add(Tile((x * TILE_SIZE, y * TILE_SIZE), ladder_img))
+                    chunk["ladders"][(x, y)] = Tile(position, images["ladder"])
                 # create platforms
                 elif cell == 3:
-                    self.game_map[current_chunk]["platforms"].add(Platform((x * TILE_SIZE, y * TILE_SIZE), platforms_imgs[0]))
+                    chunk["platforms"][(x, y)] = Platform(position, images["platforms"][0])
                 elif cell in (12, 13, 14):
-                    self.game_map[current_chunk]["platforms"].add(Platform((x * TILE_SIZE, y * TILE_SIZE), platforms_imgs[cell - 11]))
-                # create doors
-                elif cell in (4, 6):
-                    image_rect = doors[cell].get_rect(midbottom=(x * TILE_SIZE + TILE_SIZE // 2, y * TILE_SIZE + TILE_SIZE))
-                    if self.doors_data[self.current_map][f"{x};{y}"] == "player":
-                        self.doors.add(Door((image_rect.x, image_rect.y), doors[cell], None, False))
-                        self.player = Player((x * TILE_SIZE + TILE_SIZE // 2, y * TILE_SIZE + TILE_SIZE), player_images, self.selected_gun, self.enemies, self.gold_group, self.bullet_group, self.texts, self.bought_upgrades, self.player_gold, self.player_health, self.player_max_health)
-                    else:
-                        self.doors.add(Door((image_rect.x, image_rect.y), doors[cell], self.doors_data[self.current_map][f"{x};{y}"], True))
-                elif cell in (7, 8):
-                    image_rect = doors[cell].get_rect(midbottom=(x * TILE_SIZE + TILE_SIZE // 2, y * TILE_SIZE + TILE_SIZE))
-                    self.doors.add(Door((image_rect.x, image_rect.y), doors[cell], self.doors_data[self.current_map][f"{x};{y}"], False))
+                    chunk["platforms"][(x, y)] = Platform(position, images["platforms"][cell - 11])
                 # create torches
                 elif cell == 5:
-                    self.game_map[current_chunk]["torches"].add(Torch((x * TILE_SIZE, y * TILE_SIZE - 32), torch_imgs))
+                    chunk["torches"][(x, y)] = Torch((x * TILE_SIZE, y * TILE_SIZE - 32), self.animations["torch"])
                 # create lava
                 elif cell == 9:
-                    self.game_map[current_chunk]["lava"].add(Lava((x * TILE_SIZE, y * TILE_SIZE), lava_imgs))
+                    chunk["lava"][(x, y)] = Lava(position, self.animations["lava"])
                 elif cell == 10:
-                    self.game_map[current_chunk]["lava"].add(LavaTile((x * TILE_SIZE, y * TILE_SIZE), lava_img))
-                # create upgrade icons
-                elif cell == 11:
-                    name = self.randomized_upgrades.pop()
-                    self.shop_upgrades.add(Upgrade((x * TILE_SIZE + 8, y * TILE_SIZE + 8), self.upgrades_imgs[name], name))
+                    chunk["lava"][(x, y)] = LavaTile(position, images["lava_tile"])
 
                 # create background tiles
                 if cell != 1:
-                    self.game_map[current_chunk]["bg_tiles"].add(Tile((x * TILE_SIZE, y * TILE_SIZE), bg_stone_img))
-
-        # load decorations data
-        for y, row in enumerate(decorations_data):
-            current_chunk_y = y // CHUNK_SIZE
-            for x, cell in enumerate(row):
-                current_chunk_x = x // CHUNK_SIZE
-                current_chunk = f"{current_chunk_x};{current_chunk_y}"  # calculate coordinates of chunk
-
-                if cell != 0:
-                    self.game_map[current_chunk]["decorations"].add(Tile((x * TILE_SIZE, y * TILE_SIZE), decorations_imgs[cell - 1]))
-
-        # load enemies data
-        for y, row in enumerate(enemies_data):
-            for x, cell in enumerate(row):
-                if cell != 0:
-                    if cell == 1:
-                        self.enemies.add(Slime((x * TILE_SIZE, y * TILE_SIZE), choice(slimes_imgs), self.gold_group))
-                    elif cell == 2:
-                        self.enemies.add(Spider((x * TILE_SIZE, y * TILE_SIZE), small_spider_imgs, self.gold_group))
-                    elif cell == 3:
-                        self.enemies.add(SpiderAdvanced((x * TILE_SIZE, y * TILE_SIZE), big_spider_imgs, self.gold_group))
-                    elif cell == 4:
-                        self.enemies.add(Bat((x * TILE_SIZE, y * TILE_SIZE), bat_imgs, self.gold_group))
-                    elif cell == 5:
-                        self.constraints.append(Rect(x * TILE_SIZE, y * TILE_SIZE, TILE_SIZE, TILE_SIZE))
+                    chunk["bg_tiles"][(x, y)] = Tile(position, images["bg_stone"])
 
-        # positions in main rooms
-        if len(self.doors) == 1:  # achievements/highscores
-            door_pos = self.doors.sprites()[0].rect
-            self.player = Player(door_pos.midbottom, player_images, self.selected_gun, self.enemies, self.gold_group, self.bullet_group, self.texts, self.bought_upgrades, self.player_gold, self.player_health, self.player_max_health)
-        elif very_important_variable is not None:
-            self.player = Player((very_important_variable[0] * TILE_SIZE + TILE_SIZE // 2, very_important_variable[1] * TILE_SIZE + TILE_SIZE), player_images, self.selected_gun, self.enemies, self.gold_group, self.bullet_group, self.texts, self.bought_upgrades, self.player_gold, self.player_health, self.player_max_health)
-        
-        # center scroll to the player
-        self.true_scroll[0] += (self.player.rect.x - self.true_scroll[0] - 618)
-        self.true_scroll[1] += (self.player.rect.y - self.true_scroll[1] - 328)
-        self.scroll[0] = int(self.true_scroll[0])
-        self.scroll[1] = int(self.true_scroll[1])
+                # create decorations
+                decoration = level_data["decorations"][y][x]
+                if decoration != 0:
+                    chunk["decorations"][(x, y)] = Tile(position, images["decorations"][decoration - 1])
+
+        return chunk
+
+    def get_chunk(self, chunk_x: int, chunk_y: int):
+        # chunks outside of the map don't exist
+        if not (0 <= chunk_x < self.level_data["size"][0] and 0 <= chunk_y < self.level_data["size"][1]):
+            return None
+
+        target_chunk = f"{chunk_x};{chunk_y}"
+        if target_chunk in self.game_map:
+            self.game_map.move_to_end(target_chunk)
+        else:
+            self.game_map[target_chunk] = self.build_chunk(chunk_x, chunk_y, self.level_data)
+            # forget least recently used chunks
+            if len(self.game_map) > CHUNK_CACHE_SIZE:
+                self.game_map.popitem(last=False)
+        return self.game_map[target_chunk]
+
+    def prefetch_chunks(self, first_x: int, first_y: int, last_x: int, last_y: int):
+        # build one chunk per frame just outside of the active chunks, in the direction of the camera movement
+        direction_x = (self.scroll[0] > self.previous_scroll[0]) - (self.scroll[0] < self.previous_scroll[0])
+        direction_y = (self.scroll[1] > self.previous_scroll[1]) - (self.scroll[1] < self.previous_scroll[1])
+        self.previous_scroll = self.scroll.copy()
+
+        candidates = []
+        if direction_x:
+            target_x = last_x if direction_x > 0 else first_x - 1
+            candidates += [(target_x, y) for y in range(first_y, last_y)]
+        if direction_y:
+            target_y = last_y if direction_y > 0 else first_y - 1
+            candidates += [(x, target_y) for x in range(first_x, last_x)]
+
+        for chunk_x, chunk_y in candidates:
+            if f"{chunk_x};{chunk_y}" not in self.game_map and self.get_chunk(chunk_x, chunk_y) is not None:
+                return
+
+    def visible_sprites(self, layer: str, rect: Rect) -> list:
+        # sprites of the layer intersecting rect (in world coordinates),
+        # tiles are found by slicing the level arrays, not by going through whole chunks
+        left, top, right, bottom = LAYER_OVERHANG.get(layer, (0, 0, 0, 0))
+        mask = self.level_data["layers"][layer]
+        first_x = max(rect.left // TILE_SIZE - left, 0)
+        first_y = max(rect.top // TILE_SIZE - top, 0)
+        last_x = min(-(-rect.right // TILE_SIZE) + right, mask.shape[1])
+        last_y = min(-(-rect.bottom // TILE_SIZE) + bottom, mask.shape[0])
+        ys, xs = nonzero(mask[first_y:last_y, first_x:last_x])
+
+        sprites = []
+        chunks = {}
+        for y, x in zip((ys + first_y).tolist(), (xs + first_x).tolist()):
+            chunk_position = (x // CHUNK_SIZE, y // CHUNK_SIZE)
+            if chunk_position not in chunks:
+                chunks[chunk_position] = self.get_chunk(*chunk_position)
+            sprites.append(chunks[chunk_position][layer][(x, y)])
+        return sprites
 
     def earthquake(self):
         self.screen_shake -= 1
@@ -270,8 +490,8 @@ class Level:
 
     def update_scroll(self):
         # first, calculate true scroll values (floats, center of the player)
-        self.true_scroll[0] += (self.player.rect.x - self.true_scroll[0] - 618) / 25
-        self.true_scroll[1] += (self.player.rect.y - self.true_scroll[1] - 328) / 25
+        self.true_scroll[0] += (self.player.rect.x - self.true_scroll[0] - self.screen.get_width() // 2 + 22) / 25
+        self.true_scroll[1] += (self.player.rect.y - self.true_scroll[1] - self.screen.get_height() // 2 + 32) / 25
 
         # then. convert them to integers
         self.scroll[0] = int(self.true_scroll[0])
@@ -291,9 +511,14 @@ class Level:
         # reset all containers
         self.player = None
         self.game_map.clear()
+        self.static_scroll = None
         self.torch_particles.clear()
         self.bullet_group.empty()
         self.enemies.empty()
+        self.enemy_spawns.clear()
+        self.sleeping_enemies.clear()
+        if self.ground_simulation is not None:
+            self.ground_simulation.clear()
         self.texts.empty()
         self.gold_group.empty()
         self.doors.empty()
@@ -309,7 +534,21 @@ class Level:
         self.key_up = False
         self.key_down = False
 
-    def run(self):
+    def change_level(self):
+        # called when fading out is finished
+        self.restart_level()
+        self.load_level(self.transition_coords)
+        self.transition = ScreenFade(False)
+
+    def run(self, render=True):
+        # fading out - world is frozen until the level is changed
+        if self.transition is not None and self.transition.fading:
+            self.screen.blit(self.transition_snapshot, (0, 0))
+            self.transition.draw(self.screen)
+            if self.transition.finished:
+                self.change_level()
+            return
+
         # look up and down
         if self.key_up:
             self.true_scroll[1] -= 6.5
@@ -326,43 +565,138 @@ class Level:
         # update scroll values
         self.update_scroll()
 
+        # simulation first, then the frame is drawn from the render queue
+        # (without rendering the level can be stepped headless or frames can be skipped)
+        self.update()
+        if render:
+            self.draw()
+            render_scale = self.quality.render_scale
+            self.render_queue.scale = render_scale
+            if render_scale == 1:
+                self.render_queue.draw(self.screen)
+            else:
+                # lower internal resolution, scaled to the screen once
+                width, height = self.screen.get_size()
+                size = (round(width * render_scale), round(height * render_scale))
+                if self.canvas is None or self.canvas.get_size() != size:
+                    self.canvas = Surface(size)
+                self.render_queue.draw(self.canvas)
+                scale(self.canvas, (width, height), self.screen)
+        else:
+            self.render_queue.clear()
+
+        # check level changes
+        # I don't even know what I'm doing here
+        # it just works so I'm not going to touch it
+        for door in self.doors:
+            if self.player.rect.colliderect(door.rect):
+                if self.key_up and self.player.on_ground and door.allowed:
+                    coords = None
+                    if self.current_map in ("highscores", "achievements"):
+                        for coords, name in self.doors_data["level_0"].items():
+                            if name == self.current_map:
+                                coords = coords.split(';')
+                                coords = (int(coords[0]), int(coords[1]))
+                                self.current_map = "level_0"
+                                break         
+                    elif "level_" in door.leads_to:
+                        level_number = int(door.leads_to[6:])
+                        if level_number > 0:
+                            self.current_level += 1
+                            if self.current_level - 1 > self.save_data["depth"]:
+                                self.save_data["depth"] = self.current_level - 1
+                            self.save_file.save(self.save_data)
+                            if int(door.leads_to[6:]) > 1:
+                                self.current_map = "shop"
+                                self.next_map = door.leads_to
+                            else:
+                                self.current_map = door.leads_to
+                        else:
+                            self.current_map = door.leads_to
+                    elif "next" in door.leads_to:
+                        self.current_map = self.next_map
+                    else:
+                        self.current_map = door.leads_to
+
+                    self.player_gold = self.player.gold
+                    self.player_health = self.player.health
+                    self.player_max_health = self.player.max_health
+                    # level is read in background while fading out
+                    self.prefetch_level(self.current_map)
+                    self.transition = ScreenFade(True)
+                    self.transition_snapshot = self.screen.copy()
+                    self.transition_coords = coords
+                    break
+
+        # fading in
+        if self.transition is not None and not self.transition.fading:
+            self.transition.draw(self.screen)
+            if self.transition.finished:
+                self.transition = None
+
+    def create_enemy(self, x: int, y: int, cell: int):
+        position = (x * TILE_SIZE, y * TILE_SIZE)
+        if cell == 1:
+            enemy = Slime(position, choice(self.slimes_imgs), self.gold_group)
+        elif cell == 2:
+            enemy = Spider(position, self.small_spider_imgs, self.gold_group)
+        elif cell == 3:
+            enemy = SpiderAdvanced(position, self.big_spider_imgs, self.gold_group, self.nav_graph)
+        else:
+            return Bat(position, self.bat_imgs, self.gold_group, self.flow_field)
+        # walking enemies can be moved by the vectorized simulation
+        if self.ground_simulation is not None:
+            self.ground_simulation.add(enemy)
+        return enemy
+
+    def wake_enemies(self, chunks: tuple):
+        # enemies of chunks in the simulation window - created on the first visit, sleeping ones put back
+        for chunk_y in range(chunks[1], chunks[3]):
+            for chunk_x in range(chunks[0], chunks[2]):
+                if (chunk_x, chunk_y) in self.enemy_spawns:
+                    for x, y, cell in self.enemy_spawns.pop((chunk_x, chunk_y)):
+                        self.enemies.add(self.create_enemy(x, y, cell))
+                if (chunk_x, chunk_y) in self.sleeping_enemies:
+                    self.enemies.add(self.sleeping_enemies.pop((chunk_x, chunk_y)))
+
+    def sleep_enemies(self, chunks: tuple):
+        # enemies a chunk further than the window keep their state but aren't in the group
+        # (the extra chunk keeps enemies on the edge from falling asleep and waking up every frame)
+        chunk_pixels = CHUNK_SIZE * TILE_SIZE
+        for enemy in self.enemies.sprites():
+            chunk_x = enemy.rect.centerx // chunk_pixels
+            chunk_y = enemy.rect.centery // chunk_pixels
+            if not (chunks[0] - 1 <= chunk_x <= chunks[2] and chunks[1] - 1 <= chunk_y <= chunks[3]):
+                self.enemies.remove(enemy)
+                self.sleeping_enemies.setdefault((chunk_x, chunk_y), []).append(enemy)
+
+    def update(self):
+        # screen in world coordinates (window size can change) and the rect in which
+        # enemies and bullets will be updated (slightly larger than the screen)
+        self.viewport = Rect(self.scroll, self.screen.get_size())
+        self.active_rect = active_area(self.viewport)
+
         # create set with objects from active chunks (all objects except player and enemies!)
         objects = {"tiles": set(), "ladders": set(), "platforms": set(),
-                   "torches": set(), "lava": set(), "animated_tiles": set(),
+                   "torches": set(), "lava": set(),
                    "bg_tiles": set(), "decorations": set(), "collidable": set()}
 
         # iterate through every active chunk
-        for y in range(4):
-            target_y = y - 1 + round(self.scroll[1] / (CHUNK_SIZE * TILE_SIZE))
-            for x in range(5):
-                target_x = x - 1 + round(self.scroll[0] / (CHUNK_SIZE * TILE_SIZE))
-                target_chunk = f"{target_x};{target_y}"  # calculate coordinates of the active chunk
-                if target_chunk in self.game_map.keys():
-                    # add objects from few chunks to one dict with sets
-                    objects["tiles"] |= self.game_map[target_chunk]["tiles"]
-                    objects["ladders"] |= self.game_map[target_chunk]["ladders"]
-                    objects["platforms"] |= self.game_map[target_chunk]["platforms"]
-                    objects["torches"] |= self.game_map[target_chunk]["torches"]
-                    objects["lava"] |= self.game_map[target_chunk]["lava"]
-                    objects["animated_tiles"] |= self.game_map[target_chunk]["animated_tiles"]
-                    objects["bg_tiles"] |= self.game_map[target_chunk]["bg_tiles"]
-                    objects["decorations"] |= self.game_map[target_chunk]["decorations"]
-                    objects["collidable"] |= self.game_map[target_chunk]["collidable"]
-
-        # draw background tiles
-        for tile in objects["bg_tiles"]:
-            tile.draw(self.screen, self.scroll)
-
-        # draw tiles
-        for tile in set.union(objects["tiles"], objects["collidable"]):
-            tile.draw(self.screen, self.scroll)
-
-        # draw shop upgrades
+        chunks = chunk_range(self.active_rect.inflate(4 * TILE_SIZE, 4 * TILE_SIZE), self.level_data["size"])
+        for chunk_y in range(chunks[1], chunks[3]):
+            for chunk_x in range(chunks[0], chunks[2]):
+                chunk = self.get_chunk(chunk_x, chunk_y)  # built on first use
+                # add objects from few chunks to one dict with sets
+                for layer, layer_objects in objects.items():
+                    layer_objects.update(chunk[layer].values())
+        self.prefetch_chunks(*chunks)
+        self.objects = objects
+        self.wake_enemies(chunks)
+        if SLEEP_ENEMIES:
+            self.sleep_enemies(chunks)
+
+        # buy shop upgrades
         for upgrade in self.shop_upgrades:
-            upgrade.draw(self.screen, self.scroll)
-            text_img = self.font.render(f"{self.upgrades_data[upgrade.type]}$", False, WHITE, BLACK)
-            text_rect = text_img.get_rect(center=(upgrade.rect.x + 24 - self.scroll[0], upgrade.rect.y - 32 - self.scroll[1]))
-            self.screen.blit(text_img, text_rect)
             if self.player.rect.colliderect(upgrade.collision_rect):
                 if self.player.gold >= self.upgrades_data[upgrade.type] and self.key_up:
                     if upgrade.type == "Healing":
@@ -385,32 +719,75 @@ class Level:
                             self.player.gun.damage = (int(self.player.gun.damage[0] * 1.5), int(self.player.gun.damage[1] * 1.3))
                     self.player.gold -= self.upgrades_data[upgrade.type]
                     upgrade.kill()
+                    self.static_scroll = None  # bought upgrade disappears from static world
 
-        # draw doors
-        for door in self.doors:
-            door.draw(self.screen, self.scroll)
+        # advance shared animations (every torch and lava tile only looks up its frame)
+        self.animations["torch"].update()
+        if self.quality.enabled("lava animation"):
+            self.animations["lava"].update()
 
-        # draw decorations
-        for decoration in objects["decorations"]:
-            decoration.draw(self.screen, self.scroll)
+        # create torch particles (less of them if frames are too slow)
+        particle_chance = 25 if self.quality.enabled("torch particles") else 100
+        for torch in objects["torches"]:
+            torch.update(self.torch_particles, particle_chance)
 
-        # draw ladders
-        for ladder in objects["ladders"]:
-            ladder.draw(self.screen, self.scroll)
+        # update bullets
+        for bullet in self.bullet_group.copy():
+            if self.active_rect.colliderect(bullet.rect):
+                score = bullet.update(objects["collidable"], self.enemies, self.texts)
+                if score is not None:
+                    self.score += score
+                    self.save_data["kills"] += 1
+                    self.kills += 1
+            else:
+                bullet.kill()
 
-        # draw platforms
-        for platform in objects["platforms"]:
-            platform.draw(self.screen, self.scroll)
+        # update gold
+        for gold in self.gold_group:
+            if self.active_rect.colliderect(gold.rect):
+                gold.update(set.union(objects["collidable"], objects["platforms"]))
+
+        # update enemies (less often far from the player), walking ones at once if simulated
+        self.flow_field.update(self.player.rect)
+        if self.ground_simulation is not None:
+            self.ground_simulation.step(self.active_rect, self.player.rect)
+        self.enemy_scheduler.update(self.enemies, self.viewport, self.active_rect, self.player.rect,
+                                    objects["collidable"], objects["platforms"], self.constraints)
+
+        # update player
+        score = self.player.update(objects)
+        if score is not None:
+            self.score += score
+
+        # update torch particles
+        for particle in self.torch_particles.copy():
+            particle.update()
+            if particle.timer < 0.5:
+                self.torch_particles.remove(particle)
+
+        # update texts (only the newest ones if frames are too slow)
+        self.texts.update()
+        if not self.quality.enabled("damage texts"):
+            for text in self.texts.sprites()[:-4]:
+                text.kill()
+
+    def draw(self):
+        # fill render queue with the whole frame
+        queue = self.render_queue
+        objects = self.objects
+
+        # draw static world (buffer is kept only in full resolution)
+        if self.static_buffer is not None and self.quality.render_scale == 1:
+            queue.call(self.draw_static_buffer, tuple(self.scroll))
+        else:
+            self.draw_static(queue, self.scroll, self.viewport)
+            self.static_scroll = None  # buffer isn't updated meanwhile
 
         # draw high scores
         if self.current_map == "highscores":
-            text_surf = self.font.render("Highscores", False, WHITE)
-            text_rect = text_surf.get_rect(center=(8 * TILE_SIZE + 32 - self.scroll[0], 8 * TILE_SIZE - self.scroll[1]))
-            self.screen.blit(text_surf, text_rect)
-            for i, score in enumerate(sorted(self.save_data["highscores"], reverse=True)):
-                text_surf = self.font.render(f"{i + 1}. {score}", False, WHITE)
-                text_rect = text_surf.get_rect(center=(13 * TILE_SIZE - self.scroll[0], 7 * TILE_SIZE - 32 + i * 40 - self.scroll[1]))
-                self.screen.blit(text_surf, text_rect)
+            for text_surf, position in self.highscores_texts:
+                text_rect = text_surf.get_rect(center=(position[0] - self.scroll[0], position[1] - self.scroll[1]))
+                queue.blit(text_surf, text_rect)
 
         # draw achievements
         if self.current_map == "achievements":
@@ -420,159 +797,168 @@ class Level:
                 else:
                     text_surf = self.font.render(f"Kill {1000 - self.save_data['kills']} enemy", False, WHITE)
                 text_rect = text_surf.get_rect(center=(23 * TILE_SIZE - self.scroll[0] + 32, 8 * TILE_SIZE - self.scroll[1]))
-                self.screen.blit(text_surf, text_rect)
+                queue.blit(text_surf, text_rect)
                 text_surf = self.font.render("to unlock shotgun", False, WHITE)
                 text_rect = text_surf.get_rect(center=(23 * TILE_SIZE - self.scroll[0] + 32, 8 * TILE_SIZE + 40 - self.scroll[1]))
-                self.screen.blit(text_surf, text_rect)
+                queue.blit(text_surf, text_rect)
                 kills_color = DARK_GRAY
             else:
                 text_surf = self.font.render(f"You killed {self.save_data['kills']} enemies", False, WHITE)
                 text_rect = text_surf.get_rect(center=(23 * TILE_SIZE - self.scroll[0] + 32, 8 * TILE_SIZE - self.scroll[1]))
-                self.screen.blit(text_surf, text_rect)
+                queue.blit(text_surf, text_rect)
                 kills_color = WHITE
 
             if self.save_data["depth"] < 10:
                 text_surf = self.font.render(f"Complete level 10", False, WHITE)
                 text_rect = text_surf.get_rect(center=(28 * TILE_SIZE - self.scroll[0] + 32, 8 * TILE_SIZE - self.scroll[1]))
-                self.screen.blit(text_surf, text_rect)
+                queue.blit(text_surf, text_rect)
                 text_surf = self.font.render("to unlock minigun", False, WHITE)
                 text_rect = text_surf.get_rect(center=(28 * TILE_SIZE - self.scroll[0] + 32, 8 * TILE_SIZE + 40 - self.scroll[1]))
-                self.screen.blit(text_surf, text_rect)
+                queue.blit(text_surf, text_rect)
                 depth_color = DARK_GRAY
             else:
                 text_surf = self.font.render(f"Deepest level: {self.save_data['depth']}", False, WHITE)
                 text_rect = text_surf.get_rect(center=(28 * TILE_SIZE - self.scroll[0] + 32, 8 * TILE_SIZE - self.scroll[1]))
-                self.screen.blit(text_surf, text_rect)
+                queue.blit(text_surf, text_rect)
                 depth_color = WHITE
 
             text_surf = self.small_font.render(f"Press 1 to select handgun", False, DARK_GRAY)
             text_rect = text_surf.get_rect(center=(18 * TILE_SIZE - self.scroll[0] + 32, 8 * TILE_SIZE - 10 - self.scroll[1]))
-            self.screen.blit(text_surf, text_rect)
+            queue.blit(text_surf, text_rect)
             text_surf = self.small_font.render("Press 2 to select shotgun", False, kills_color)
             text_rect = text_surf.get_rect(center=(18 * TILE_SIZE - self.scroll[0] + 32, 8 * TILE_SIZE + 20 - self.scroll[1]))
-            self.screen.blit(text_surf, text_rect)
+            queue.blit(text_surf, text_rect)
             text_surf = self.small_font.render("Press 3 to select minigun", False, depth_color)
             text_rect = text_surf.get_rect(center=(18 * TILE_SIZE - self.scroll[0] + 32, 8 * TILE_SIZE + 50 - self.scroll[1]))
-            self.screen.blit(text_surf, text_rect)
-
-        # update and draw animated tiles
-        for tile in objects["animated_tiles"]:
-            tile.update(self.screen, self.scroll)
+            queue.blit(text_surf, text_rect)
 
-        # update and draw torches, create particles
-        for torch in objects["torches"]:
-            torch.update(self.screen, self.scroll, self.torch_particles)
+        # draw torches
+        draw_layer(queue, self.visible_sprites("torches", self.viewport), self.scroll)
 
-        # create rect (slightly larger than screen rect) in which enemies and bullets will be updated
-        active_rect = Rect(self.scroll[0] - 128, self.scroll[1] - 128,
-                           SCREEN_SIZE[0] + 256, SCREEN_SIZE[1] + 256)
-
-        # update and draw bullets
-        for bullet in self.bullet_group.copy():
-            if active_rect.colliderect(bullet.rect):
-                score = bullet.update(self.screen, self.scroll, objects["collidable"], self.enemies, self.texts)
-                if score is not None:
-                    self.score += score
-                    self.save_data["kills"] += 1
-            else:
-                bullet.kill()
+        # draw bullets
+        draw_layer(queue, self.bullet_group, self.scroll)
 
         # draw gold
-        for gold in self.gold_group:
-            if active_rect.colliderect(gold.rect):
-                gold.update(self.screen, self.scroll, set.union(objects["collidable"], objects["platforms"]))
+        draw_layer(queue, [gold for gold in self.gold_group if self.active_rect.colliderect(gold.rect)], self.scroll)
 
-        # update and draw enemies
+        # draw enemies
         for enemy in self.enemies:
-            if active_rect.colliderect(enemy.rect):
-                enemy.update(self.screen, self.scroll, objects["collidable"], objects["platforms"], self.player.rect, self.constraints)
+            if self.active_rect.colliderect(enemy.rect):
+                enemy.draw(queue, self.scroll)
 
-        # update and draw player
-        score = self.player.update(self.screen, self.scroll, objects)
-        if score is not None:
-            self.score += score
+        # draw player
+        self.player.draw(queue, self.scroll)
 
-        # update and draw lava
-        for lava in objects["lava"]:
-            if active_rect.colliderect(lava.rect):
-                lava.update(self.screen, self.scroll)
+        # draw lava
+        draw_layer(queue, self.visible_sprites("lava", self.viewport), self.scroll)
 
-        # update and draw torch particles
-        for particle in self.torch_particles.copy():
-            particle.update(self.screen, self.scroll)
-            if particle.timer < 0.5:
-                self.torch_particles.remove(particle)
+        # draw torch particles
+        for particle in self.torch_particles:
+            particle.draw(queue, self.scroll)
 
         # draw texts
-        self.texts.update(self.screen, self.scroll)
+        draw_layer(queue, self.texts, self.scroll)
 
-        # darkness and light effects
+        # darkness and light effects (positions taken now, drawn with the rest of the queue)
         if self.darkness:
-            # create darkness surface
-            darkness = Surface(SCREEN_SIZE)
-            darkness.fill((0, 0, 0))
-            # player light
-            darkness.blit(self.player_light, self.player_light.get_rect(center=(self.player.rect.centerx - self.scroll[0], self.player.rect.centery - self.scroll[1])))
-            # torch lights
-            for torch in objects["torches"]:
-                darkness.blit(self.torch_light, self.torch_light.get_rect(center=(torch.rect.centerx - self.scroll[0], torch.rect.centery - self.scroll[1])))
-            # torch particle lights
-            for particle in self.torch_particles:
-                darkness.blit(self.torch_particle_light, self.torch_particle_light.get_rect(center=(particle.position[0] - self.scroll[0], particle.position[1] - self.scroll[1])))
-            # lava light
-            for lava in objects["lava"]:
-                darkness.blit(self.lava_light, self.lava_light.get_rect(center=(lava.rect.centerx - self.scroll[0], lava.rect.centery - self.scroll[1])))
-            # bullet lights
-            for bullet in self.bullet_group:
-                darkness.blit(self.bullet_light, self.bullet_light.get_rect(center=(bullet.rect.centerx - self.scroll[0], bullet.rect.centery - self.scroll[1])))
-
-            self.screen.blit(darkness, (0, 0), special_flags=BLEND_RGBA_MULT)
+            # (small lights are the first to go when frames are too slow)
+            lights = [
+                (self.player_light, [self.player.rect.center]),
+                (self.torch_light, [torch.rect.center for torch in objects["torches"]])
+            ]
+            if self.quality.enabled("particle lights"):
+                lights.append((self.torch_particle_light, [tuple(particle.position) for particle in self.torch_particles]))
+            lights.append((self.lava_light, [lava.rect.center for lava in objects["lava"]]))
+            if self.quality.enabled("bullet lights"):
+                lights.append((self.bullet_light, [bullet.rect.center for bullet in self.bullet_group]))
+            queue.call(self.draw_darkness, lights, tuple(self.scroll))
 
         # draw UI
-        self.health_bar.draw(self.screen, self.player.health, self.player.max_health)
-        self.mana_bar.draw(self.screen, self.player.mana, self.player.max_mana)
-        gold_amount = self.font.render(f"$: {self.player.gold}", False, WHITE)
-        self.screen.blit(gold_amount, (SCREEN_SIZE[0] - 200, 88))
+        self.health_bar.draw(queue, self.player.health, self.player.max_health)
+        self.mana_bar.draw(queue, self.player.mana, self.player.max_mana)
+        # rendered again only when the amount changes (a new text every frame would be scaled every frame)
+        if self.gold_text[0] != self.player.gold:
+            self.gold_text = (self.player.gold, self.font.render(f"$: {self.player.gold}", False, WHITE))
+        queue.blit(self.gold_text[1], (SCREEN_SIZE[0] - 200, 88))
+
+    def draw_static(self, target, scroll: tuple, rect: Rect):
+        # static world in rect (world coordinates)
+        # draw background tiles
+        draw_layer(target, self.visible_sprites("bg_tiles", rect), scroll)
 
-        # check level changes
-        # I don't even know what I'm doing here
-        # it just works so I'm not going to touch it
-        for door in self.doors:
-            if self.player.rect.colliderect(door.rect):
-                if self.key_up and self.player.on_ground and door.allowed:
-                    coords = None
-                    if self.current_map in ("highscores", "achievements"):
-                        for coords, name in self.doors_data["level_0"].items():
-                            if name == self.current_map:
-                                coords = coords.split(';')
-                                coords = (int(coords[0]), int(coords[1]))
-                                self.current_map = "level_0"
-                                break         
-                    elif "level_" in door.leads_to:
-                        level_number = int(door.leads_to[6:])
-                        if level_number > 0:
-                            self.current_level += 1
-                            if self.current_level - 1 > self.save_data["depth"]:
-                                self.save_data["depth"] = self.current_level - 1
-                            with open("save.json", "w") as f:
-                                dump_to_json(self.save_data, f, indent=4)
-                            if int(door.leads_to[6:]) > 1:
-                                self.current_map = "shop"
-                                self.next_map = door.leads_to
-                            else:
-                                self.current_map = door.leads_to
-                        else:
-                            self.current_map = door.leads_to
-                    elif "next" in door.leads_to:
-                        self.current_map = self.next_map
-                    else:
-                        self.current_map = door.leads_to
+        # draw tiles
+        draw_layer(target, self.visible_sprites("tiles", rect), scroll)
+        draw_layer(target, self.visible_sprites("collidable", rect), scroll)
 
-                    self.player_gold = self.player.gold
-                    self.player_health = self.player.health
-                    self.player_max_health = self.player.max_health
-                    screen_fade(self.screen, self.clock, True)
-                    self.restart_level()
-                    self.load_level(coords)
-                    self.run()
-                    screen_fade(self.screen, self.clock, False)
+        # draw shop upgrades
+        for upgrade in self.shop_upgrades:
+            upgrade.draw(target, scroll)
+            price = self.upgrades_data[upgrade.type]
+            if price not in self.price_texts:
+                self.price_texts[price] = self.font.render(f"{price}$", False, WHITE, BLACK)
+            text_img = self.price_texts[price]
+            text_rect = text_img.get_rect(center=(upgrade.rect.x + 24 - scroll[0], upgrade.rect.y - 32 - scroll[1]))
+            target.blit(text_img, text_rect)
+
+        # draw doors
+        draw_layer(target, self.doors, scroll)
+
+        # draw decorations
+        draw_layer(target, self.visible_sprites("decorations", rect), scroll)
+
+        # draw ladders
+        draw_layer(target, self.visible_sprites("ladders", rect), scroll)
+
+        # draw platforms
+        draw_layer(target, self.visible_sprites("platforms", rect), scroll)
+
+    def draw_static_buffer(self, screen: Surface, scroll: tuple):
+        # move what was drawn last frame with the camera and draw only uncovered strips
+        if self.static_buffer.get_size() != screen.get_size():
+            self.static_buffer = Surface(screen.get_size())
+            self.static_scroll = None
+        width, height = screen.get_size()
+        if self.static_scroll is None:
+            dx, dy = width, height
+        else:
+            dx = scroll[0] - self.static_scroll[0]
+            dy = scroll[1] - self.static_scroll[1]
+
+        if abs(dx) >= width or abs(dy) >= height:
+            strips = [self.static_buffer.get_rect()]
+        else:
+            self.static_buffer.scroll(-dx, -dy)
+            strips = []
+            if dx > 0:
+                strips.append(Rect(width - dx, 0, dx, height))
+            elif dx < 0:
+                strips.append(Rect(0, 0, -dx, height))
+            if dy > 0:
+                strips.append(Rect(0, height - dy, width, dy))
+            elif dy < 0:
+                strips.append(Rect(0, 0, width, -dy))
+
+        # only tiles in the strip are drawn, clipping cuts off the rest of their images
+        for strip in strips:
+            self.static_buffer.set_clip(strip)
+            self.static_buffer.fill(BLACK)
+            self.draw_static(self.static_buffer, scroll, strip.move(scroll))
+        self.static_buffer.set_clip(None)
+        self.static_scroll = scroll
+
+        screen.blit(self.static_buffer, (0, 0))
+
+    def draw_darkness(self, screen: Surface, lights: tuple, scroll: tuple):
+        # darkness surface with lights, multiplied with the frame
+        if self.darkness_surface.get_size() != screen.get_size():
+            self.darkness_surface = Surface(screen.get_size())
+        self.darkness_surface.fill(BLACK)
+        size = self.render_queue.scale
+        for light, centers in lights:
+            if size != 1:
+                light = self.render_queue.scaled(light)
+                centers = [((x - scroll[0]) * size, (y - scroll[1]) * size) for x, y in centers]
+                draw_lights(self.darkness_surface, light, centers, (0, 0))
+            else:
+                draw_lights(self.darkness_surface, light, centers, scroll)
+        screen.blit(self.darkness_surface, (0, 0), special_flags=BLEND_MULT)
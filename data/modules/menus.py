@@ -1,14 +1,53 @@
-from pygame.font import Font
 from pygame.surface import Surface
 
+from .assets import load_font
 from .constants import DARK_GRAY, LIGHT_PURPLE, SCREEN_SIZE, WHITE
 
 
-class Menu:
+class MenuBase:
     def __init__(self):
         # menu font
-        self.font = Font("data/fonts/Pixellari.ttf", 48)
-        self.title = Font("data/fonts/Pixellari.ttf", 96).render("Mine Shot", True, WHITE)
+        self.font = load_font("data/fonts/Pixellari.ttf", 48)
+
+        # rendered texts - (text, color): surface
+        self.rendered = {}
+        # items (surface, rect) drawn on the screen last time
+        self.drawn = []
+
+    def render(self, text: str, color: tuple) -> Surface:
+        if (text, color) not in self.rendered:
+            self.rendered[(text, color)] = self.font.render(text, True, color)
+        return self.rendered[(text, color)]
+
+    def get_items(self) -> list:
+        # (surface, rect) of everything menu shows
+        return []
+
+    def draw(self, screen: Surface):
+        self.drawn = self.get_items()
+        for surface, rect in self.drawn:
+            screen.blit(surface, rect)
+
+    def draw_changes(self, screen: Surface, background: Surface) -> list:
+        # redraw only items which changed since the last draw, return dirty rects
+        items = self.get_items()
+        dirty = []
+        for (surface, rect), (old_surface, old_rect) in zip(items, self.drawn):
+            if surface is not old_surface or rect != old_rect:
+                dirty.append(rect.union(old_rect))
+        for rect in dirty:
+            screen.blit(background, rect, rect)
+        for surface, rect in items:
+            if rect.collidelist(dirty) != -1:
+                screen.blit(surface, rect)
+        self.drawn = items
+        return dirty
+
+
+class Menu(MenuBase):
+    def __init__(self):
+        super().__init__()
+        self.title = load_font("data/fonts/Pixellari.ttf", 96).render("Mine Shot", True, WHITE)
         self.title_rect = self.title.get_rect(center=(SCREEN_SIZE[0] // 2, 120))
 
         # texts and their positions
@@ -27,16 +66,17 @@ class Menu:
         self.key_up = False
         self.key_down = False
 
-    def draw(self, screen: Surface):
-        screen.blit(self.title, self.title_rect)
+    def get_items(self) -> list:
+        items = [(self.title, self.title_rect)]
 
         for i, text in enumerate(self.texts):
             if i == self.highlighted:
-                text_surface = self.font.render(text, True, LIGHT_PURPLE)
+                text_surface = self.render(text, LIGHT_PURPLE)
             else:
-                text_surface = self.font.render(text, True, WHITE)
-            text_rect = text_surface.get_rect(center=self.positions[i])
-            screen.blit(text_surface, text_rect)
+                text_surface = self.render(text, WHITE)
+            items.append((text_surface, text_surface.get_rect(center=self.positions[i])))
+
+        return items
 
     def update(self):
         # move highlight up
@@ -56,14 +96,13 @@ class Menu:
                 self.highlighted += 1
 
 
-class SettingsMenu:
+class SettingsMenu(MenuBase):
     def __init__(self, settings):
+        super().__init__()
+
         # global settings
         self.settings = settings
 
-        # menu font
-        self.font = Font("data/fonts/Pixellari.ttf", 48)
-
         # texts and their positions
         self.texts = ("Fullscreen", "Music volume", "Sounds volume", "Reset progress")
         self.positions = (
@@ -80,15 +119,16 @@ class SettingsMenu:
         self.key_up = False
         self.key_down = False
 
-    def draw(self, screen: Surface):
+    def get_items(self) -> list:
+        items = []
+
         # settings buttons
         for i, text in enumerate(self.texts):
             if i == self.highlighted:
-                text_surface = self.font.render(text, True, LIGHT_PURPLE)
+                text_surface = self.render(text, LIGHT_PURPLE)
             else:
-                text_surface = self.font.render(text, True, WHITE)
-            text_rect = text_surface.get_rect(topleft=self.positions[i])
-            screen.blit(text_surface, text_rect)
+                text_surface = self.render(text, WHITE)
+            items.append((text_surface, text_surface.get_rect(topleft=self.positions[i])))
 
         # settings values
         for i, value in enumerate(self.settings.values()):
@@ -103,17 +143,17 @@ class SettingsMenu:
                     text = "On"
                 else:
                     text = "Off"
-            text_surface = self.font.render(text, True, color)
-            text_rect = text_surface.get_rect(topright=(SCREEN_SIZE[0] - self.positions[i][0], self.positions[i][1]))
-            screen.blit(text_surface, text_rect)
+            text_surface = self.render(text, color)
+            items.append((text_surface, text_surface.get_rect(topright=(SCREEN_SIZE[0] - self.positions[i][0], self.positions[i][1]))))
 
         # return button
         if self.highlighted == 4:
-            text_surface = self.font.render("Return", True, LIGHT_PURPLE)
+            text_surface = self.render("Return", LIGHT_PURPLE)
         else:
-            text_surface = self.font.render("Return", True, WHITE)
-        text_rect = text_surface.get_rect(center=(SCREEN_SIZE[0] // 2, SCREEN_SIZE[1] - 100))
-        screen.blit(text_surface, text_rect)
+            text_surface = self.render("Return", WHITE)
+        items.append((text_surface, text_surface.get_rect(center=(SCREEN_SIZE[0] // 2, SCREEN_SIZE[1] - 100))))
+
+        return items
 
     def update(self):
         # move highlight up
@@ -133,20 +173,17 @@ class SettingsMenu:
                 self.highlighted += 1
 
 
-class PauseMenu:
+class PauseMenu(MenuBase):
     def __init__(self):
-        self.menu_rect = Surface((480, 244))
-        self.menu_position = self.menu_rect.get_rect(center=(SCREEN_SIZE[0] // 2, SCREEN_SIZE[1] // 2))
-
-        # menu font
-        self.font = Font("data/fonts/Pixellari.ttf", 48)
+        super().__init__()
+        self.menu_position = Surface((480, 244)).get_rect(center=(SCREEN_SIZE[0] // 2, SCREEN_SIZE[1] // 2))
 
         # texts and positions
         self.texts = ("Back to Game", "Settings", "Quit to Title")
         self.positions = (
-            (self.menu_rect.get_width() // 2, 64),
-            (self.menu_rect.get_width() // 2, 128),
-            (self.menu_rect.get_width() // 2, 192)
+            (self.menu_position.centerx, self.menu_position.top + 64),
+            (self.menu_position.centerx, self.menu_position.top + 128),
+            (self.menu_position.centerx, self.menu_position.top + 192)
         )
 
         # highlighted menu option
@@ -156,16 +193,23 @@ class PauseMenu:
         self.key_up = False
         self.key_down = False
 
+    def draw_panel(self, screen: Surface):
+        # menu background (smaller rect, without clearing screen)
+        screen.fill(DARK_GRAY, self.menu_position)
+
     def draw(self, screen: Surface):
-        self.menu_rect.fill(DARK_GRAY)
+        self.draw_panel(screen)
+        super().draw(screen)
+
+    def get_items(self) -> list:
+        items = []
         for i, text in enumerate(self.texts):
             if i == self.highlighted:
-                text_surface = self.font.render(text, True, LIGHT_PURPLE)
+                text_surface = self.render(text, LIGHT_PURPLE)
             else:
-                text_surface = self.font.render(text, True, WHITE)
-            text_rect = text_surface.get_rect(center=self.positions[i])
-            self.menu_rect.blit(text_surface, text_rect)
-        screen.blit(self.menu_rect, self.menu_position)
+                text_surface = self.render(text, WHITE)
+            items.append((text_surface, text_surface.get_rect(center=self.positions[i])))
+        return items
 
     def update(self):
         # move highlight up
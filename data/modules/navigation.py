@@ -0,0 +1,202 @@
+from collections import OrderedDict
+from heapq import heappop, heappush
+
+from numpy import argmin, array, bool_, full, int32, isin, nonzero, pad, stack, zeros
+from pygame.rect import Rect
+
+from .constants import FLOW_FIELD_RADIUS, PURSUIT_DISTANCE, ROUTE_CACHE_SIZE, TILE_SIZE
+from .generator import JUMP_HEIGHT
+
+# neighbours of a cell (x, y offsets), diagonal ones only when both sides are free (no cutting corners)
+NEIGHBOURS = ((0, 0), (1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1))
+NEIGHBOUR_X = array([x for x, _ in NEIGHBOURS], dtype=int32)
+NEIGHBOUR_Y = array([y for _, y in NEIGHBOURS], dtype=int32)
+UNREACHED = 1 << 20
+
+
+class FlowField:
+    def __init__(self, radius=FLOW_FIELD_RADIUS):
+        # distances (breadth-first, 4 directions) from the player's cell to every free cell around it
+        # and the neighbour every cell leads to - shared by all bats, recomputed only when the player
+        # gets to another cell
+        self.radius = radius
+        self.passable = zeros((1, 1), dtype=bool_)  # rows, columns
+        self.cell = None  # player's cell the field leads to
+        self.origin = (0, 0)  # (column, row) of the window's top left cell
+        self.distances = full((1, 1), -1, dtype=int32)
+        self.directions = zeros((1, 1, 2), dtype=int32)  # (x, y) offset of the next cell
+
+    def set_level(self, map_data):
+        self.passable = map_data != 1
+        self.cell = None
+
+    def update(self, player_rect: Rect):
+        cell = (player_rect.centerx // TILE_SIZE, player_rect.centery // TILE_SIZE)
+        if cell == self.cell:
+            return
+        self.cell = cell
+
+        # only a window around the player (bats chase only what they see)
+        rows, columns = self.passable.shape
+        left, top = max(cell[0] - self.radius, 0), max(cell[1] - self.radius, 0)
+        right, bottom = min(cell[0] + self.radius + 1, columns), min(cell[1] + self.radius + 1, rows)
+        self.origin = (left, top)
+        passable = self.passable[top:bottom, left:right]
+        distances = full(passable.shape, -1, dtype=int32)
+        if not (0 <= cell[0] - left < passable.shape[1] and 0 <= cell[1] - top < passable.shape[0]):
+            self.distances = distances
+            self.directions = zeros(passable.shape + (2, ), dtype=int32)
+            return
+
+        # breadth-first search - the whole wavefront grows by one cell at once
+        frontier = zeros(passable.shape, dtype=bool_)
+        frontier[cell[1] - top, cell[0] - left] = True
+        distances[frontier] = 0
+        distance = 0
+        while frontier.any():
+            distance += 1
+            grown = zeros(passable.shape, dtype=bool_)
+            grown[1:, :] |= frontier[:-1, :]
+            grown[:-1, :] |= frontier[1:, :]
+            grown[:, 1:] |= frontier[:, :-1]
+            grown[:, :-1] |= frontier[:, 1:]
+            frontier = grown & passable & (distances < 0)
+            distances[frontier] = distance
+        self.distances = distances
+
+        # every cell leads to its closest neighbour
+        height, width = distances.shape
+        padded_distances = pad(distances, 1, constant_values=-1)
+        padded_passable = pad(passable, 1, constant_values=False)
+        candidates = []
+        for x, y in NEIGHBOURS:
+            neighbour = padded_distances[1 + y:1 + y + height, 1 + x:1 + x + width].copy()
+            neighbour[neighbour < 0] = UNREACHED
+            if x and y:
+                side_x = padded_passable[1:1 + height, 1 + x:1 + x + width]
+                side_y = padded_passable[1 + y:1 + y + height, 1:1 + width]
+                neighbour[~(side_x & side_y)] = UNREACHED
+            candidates.append(neighbour)
+        best = argmin(stack(candidates), axis=0)
+        self.directions = stack((NEIGHBOUR_X[best], NEIGHBOUR_Y[best]), axis=-1)
+
+    def distance(self, position: tuple) -> int:
+        # cells to the player from position, -1 if it can't be reached (or is too far)
+        x = position[0] // TILE_SIZE - self.origin[0]
+        y = position[1] // TILE_SIZE - self.origin[1]
+        if 0 <= y < self.distances.shape[0] and 0 <= x < self.distances.shape[1]:
+            return int(self.distances[y, x])
+        return -1
+
+    def next_cell_center(self, position: tuple):
+        # center of the cell to go to from position, None if the player is close or can't be reached
+        if self.distance(position) <= 1:
+            return None
+        x = position[0] // TILE_SIZE
+        y = position[1] // TILE_SIZE
+        offset_x, offset_y = self.directions[y - self.origin[1], x - self.origin[0]]
+        return (x + int(offset_x)) * TILE_SIZE + TILE_SIZE // 2, (y + int(offset_y)) * TILE_SIZE + TILE_SIZE // 2
+
+    def solid_rects(self, rect: Rect) -> list:
+        # rects of solid cells overlapping rect (instead of checking every tile)
+        rows, columns = self.passable.shape
+        rects = []
+        for y in range(max(rect.top // TILE_SIZE, 0), min((rect.bottom - 1) // TILE_SIZE + 1, rows)):
+            for x in range(max(rect.left // TILE_SIZE, 0), min((rect.right - 1) // TILE_SIZE + 1, columns)):
+                if not self.passable[y, x]:
+                    rects.append(Rect(x * TILE_SIZE, y * TILE_SIZE, TILE_SIZE, TILE_SIZE))
+        return rects
+
+
+class NavGraph:
+    def __init__(self, map_data):
+        # cells walking enemies can stand in (on stone or a platform, or holding a ladder)
+        # and moves between them - built once for the level, can run on the prefetch worker
+        solid = map_data == 1
+        platforms = isin(map_data, (3, 12, 13, 14))
+        self.ladders = map_data == 2
+        self.free = ~solid & ~platforms & ~isin(map_data, (9, 10))  # no stone, platform or lava
+        self.standable = self.free.copy()
+        self.standable[:-1] &= solid[1:] | platforms[1:] | self.ladders[:-1]
+        self.standable[-1] = False
+
+        # moves are stored reversed - cell: [(cell the move starts in, kind, cost)]
+        self.links = {}
+        for y, x in zip(*nonzero(self.standable)):
+            for target, kind, cost in self.moves(int(x), int(y), solid):
+                self.links.setdefault(target, []).append(((int(x), int(y)), kind, cost))
+
+        # target cell: {cell: (next cell, kind of the move, cost to the target)}, least recently used first
+        self.routes = OrderedDict()
+
+    def moves(self, x: int, y: int, solid):
+        # walking (or dropping from a ledge), jumping up and climbing from (x, y)
+        height, width = self.free.shape
+        for d in (-1, 1):
+            if 0 <= x + d < width and self.free[y, x + d]:
+                landing = y
+                while not self.standable[landing, x + d] and landing + 1 < height and self.free[landing + 1, x + d]:
+                    landing += 1
+                if self.standable[landing, x + d]:
+                    yield (x + d, landing), "walk" if landing == y else "drop", 1 + (landing - y) / 2
+        for k in range(1, JUMP_HEIGHT + 1):
+            if self.ladders[y, x] or y - k < 0 or solid[y - k, x]:
+                break  # no jumping from ladders (climbing instead) or through stone
+            for d in (-1, 0, 1):
+                if 0 <= x + d < width and self.standable[y - k, x + d]:
+                    yield (x + d, y - k), "jump", 1 + k
+        if self.ladders[y, x] and y > 0 and self.ladders[y - 1, x]:
+            yield (x, y - 1), "climb", 1
+        if y + 1 < height and self.ladders[y + 1, x]:
+            yield (x, y + 1), "climb", 1
+
+    def cell_at(self, rect: Rect):
+        # cell the rect stands in - over the tile supporting it (it can hang over a ledge
+        # with its center above the gap), the cell it lands in when falling, None if there is none
+        height, width = self.free.shape
+        x, y = rect.centerx // TILE_SIZE, (rect.bottom - 1) // TILE_SIZE
+        if not 0 <= y < height:
+            return None
+        if rect.bottom % TILE_SIZE == 0:
+            for column in (x, rect.left // TILE_SIZE, (rect.right - 1) // TILE_SIZE):
+                if 0 <= column < width and self.standable[y, column]:
+                    return column, y
+        if not 0 <= x < width:
+            return None
+        while y < height - 1 and not self.standable[y, x] and self.free[y + 1, x]:
+            y += 1
+        return (x, y) if self.standable[y, x] else None
+
+    def on_ladder(self, rect: Rect) -> bool:
+        x, y = rect.centerx // TILE_SIZE, (rect.bottom - 1) // TILE_SIZE
+        return 0 <= y < self.ladders.shape[0] and 0 <= x < self.ladders.shape[1] and bool(self.ladders[y, x])
+
+    def route(self, target: tuple) -> dict:
+        # moves to target from every cell near it (Dijkstra), cached - every enemy
+        # going after the same target uses the same search
+        if target in self.routes:
+            self.routes.move_to_end(target)
+            return self.routes[target]
+        route = {target: (None, None, 0)}
+        queue = [(0, target)]
+        while queue:
+            cost, cell = heappop(queue)
+            if cost > route[cell][2]:
+                continue
+            for previous, kind, move_cost in self.links.get(cell, ()):
+                new_cost = cost + move_cost
+                if new_cost <= PURSUIT_DISTANCE and (previous not in route or new_cost < route[previous][2]):
+                    route[previous] = (cell, kind, new_cost)
+                    heappush(queue, (new_cost, previous))
+        self.routes[target] = route
+        if len(self.routes) > ROUTE_CACHE_SIZE:
+            self.routes.popitem(last=False)
+        return route
+
+    def next_step(self, rect: Rect, target_rect: Rect):
+        # (next cell, kind, cost) on the way from rect to target_rect, None if already there or too far
+        start = self.cell_at(rect)
+        target = self.cell_at(target_rect)
+        if start is None or target is None or start == target:
+            return None
+        return self.route(target).get(start)
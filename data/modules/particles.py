@@ -1,7 +1,6 @@
 from random import choice, randint
 
-from pygame.draw import circle as draw_circle
-from pygame.surface import Surface
+from .render import RenderQueue
 
 
 class TorchParticle:
@@ -14,14 +13,14 @@ class TorchParticle:
 
         self.COLOR = choice(((235, 83, 28), (240, 240, 31), (247, 215, 36)))
 
-    def update(self, screen: Surface, scroll: list):
-        # draw particle
-        draw_circle(
-            screen, self.COLOR,
+    def draw(self, queue: RenderQueue, scroll: list):
+        queue.circle(
+            self.COLOR,
             (int(self.position[0] - scroll[0]), int(self.position[1] - scroll[1])),
             int(self.timer)
         )
 
+    def update(self):
         # change size and position of the particle
         self.position[0] += self.velocity[0]
         self.position[1] += self.velocity[1]
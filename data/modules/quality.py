@@ -0,0 +1,41 @@
+from .constants import DYNAMIC_RESOLUTION, FPS, RENDER_SCALE, RENDER_SCALES
+
+# optional work given up (in this order) when frames take too long,
+# then (dynamic resolution) lower internal resolution
+QUALITY_STEPS = ("torch particles", "particle lights", "bullet lights", "lava animation", "damage texts")
+
+
+class QualityGovernor:
+    def __init__(self, render_scale=RENDER_SCALE, dynamic_resolution=DYNAMIC_RESOLUTION):
+        # the only one reacting to the frame time - effects and resolution share one budget and hysteresis
+        self.budget = 1000 / FPS  # ms per frame
+        self.average = self.budget / 2  # smoothed frame time, single spikes don't count
+        self.degraded = 0  # how many steps are given up
+        self.render_scale = render_scale
+        self.dynamic_resolution = dynamic_resolution
+        self.frames_since_change = 0
+
+    def update(self, frame_time: float):
+        self.average += (frame_time - self.average) * 0.1
+        self.frames_since_change += 1
+
+        # give up the next step quickly, restore only after a longer while with clear headroom
+        # (different thresholds and waiting times, so it doesn't jump between steps) -
+        # resolution is lowered only when all effects are given up and raised back first
+        scale_step = RENDER_SCALES.index(self.render_scale)
+        if self.average > self.budget and self.frames_since_change >= 30:
+            if self.degraded < len(QUALITY_STEPS):
+                self.degraded += 1
+            elif self.dynamic_resolution and scale_step < len(RENDER_SCALES) - 1:
+                self.render_scale = RENDER_SCALES[scale_step + 1]
+            self.frames_since_change = 0  # even with nothing left to give up - headroom is waited for from now
+        elif self.average < self.budget * 0.7 and self.frames_since_change >= 180:
+            if self.dynamic_resolution and scale_step > 0:
+                self.render_scale = RENDER_SCALES[scale_step - 1]
+                self.frames_since_change = 0
+            elif self.degraded > 0:
+                self.degraded -= 1
+                self.frames_since_change = 0
+
+    def enabled(self, step: str) -> bool:
+        return QUALITY_STEPS.index(step) >= self.degraded
@@ -0,0 +1,95 @@
+from weakref import WeakKeyDictionary
+
+from pygame.draw import circle as draw_circle
+from pygame.locals import RLEACCEL
+from pygame.rect import Rect
+from pygame.surface import Surface
+from pygame.transform import flip, scale as scale_image
+
+# flipped and dimmed (blinking) copies of sprite frames - shared by all sprites, created only once
+# (a new surface every frame would be scaled again every frame by RenderQueue.scaled)
+frame_variants = {}  # (image, flipped, dimmed): copy
+
+
+def frame_variant(image: Surface, flipped=False, dimmed=False) -> Surface:
+    if not flipped and not dimmed:
+        return image
+    key = (image, flipped, dimmed)
+    if key not in frame_variants:
+        variant = flip(image, flipped, False)
+        if image.get_colorkey() is not None:
+            variant.set_colorkey(image.get_colorkey(), RLEACCEL)
+        if dimmed:
+            variant.set_alpha(63)
+        frame_variants[key] = variant
+    return frame_variants[key]
+
+
+class RenderQueue:
+    def __init__(self):
+        # draw commands (function, args) in drawing order, filled during the frame
+        # and drawn at once - blits in a row are merged into one blits call
+        self.commands = []
+
+        # size of the target relative to the coordinates used by commands
+        # (lower than 1 - drawn in lower internal resolution)
+        self.scale = 1
+        self.scaled_images = WeakKeyDictionary()  # image: (scale, scaled image)
+
+    def blit(self, image: Surface, position: tuple, area=None, special_flags=0):
+        if area is not None or special_flags:
+            self.commands.append((Surface.blit, (image, position, area, special_flags)))
+        else:
+            self.blits(((image, position), ))
+
+    def blits(self, blit_sequence, doreturn=False):
+        if not self.commands or self.commands[-1][0] is not Surface.blits:
+            self.commands.append((Surface.blits, ([], False)))
+        self.commands[-1][1][0].extend(blit_sequence)
+
+    def circle(self, color: tuple, center: tuple, radius: int):
+        self.commands.append((draw_circle, (color, center, radius)))
+
+    def call(self, function, *args):
+        # any other drawing - function(screen, *args), has to handle the scale by itself
+        self.commands.append((function, args))
+
+    def clear(self):
+        self.commands.clear()
+
+    def scaled(self, image: Surface) -> Surface:
+        # image in the current scale, every image is scaled only once
+        if self.scale == 1:
+            return image
+        cached = self.scaled_images.get(image)
+        if cached is None or cached[0] != self.scale:
+            size = (max(round(image.get_width() * self.scale), 1), max(round(image.get_height() * self.scale), 1))
+            cached = (self.scale, scale_image(image, size))
+            if image.get_colorkey() is not None:
+                cached[1].set_colorkey(image.get_colorkey(), RLEACCEL)  # scaling keeps the colorkey, not RLE
+            self.scaled_images[image] = cached
+        cached[1].set_alpha(image.get_alpha())  # alpha can change (blinking, fading texts)
+        return cached[1]
+
+    def draw(self, screen: Surface):
+        if self.scale == 1:
+            for function, args in self.commands:
+                function(screen, *args)
+        else:
+            size = self.scale
+            for function, args in self.commands:
+                if function is Surface.blits:
+                    screen.blits([(self.scaled(image), (round(position[0] * size), round(position[1] * size)))
+                                  for image, position in args[0]], False)
+                elif function is Surface.blit:
+                    image, position, area, special_flags = args
+                    if area is not None:
+                        area = Rect(area)
+                        area = Rect(round(area.x * size), round(area.y * size), round(area.w * size), round(area.h * size))
+                    screen.blit(self.scaled(image), (round(position[0] * size), round(position[1] * size)), area, special_flags)
+                elif function is draw_circle:
+                    color, center, radius = args
+                    draw_circle(screen, color, (round(center[0] * size), round(center[1] * size)), max(round(radius * size), 1))
+                else:
+                    function(screen, *args)
+        self.commands.clear()
@@ -0,0 +1,85 @@
+from atexit import register
+from json import dumps
+from os import fsync, replace
+from threading import Condition, Thread
+
+# seconds before a failed save is written again (doubled after every failure)
+RETRY_DELAY = 1
+MAX_RETRY_DELAY = 30
+
+
+class SaveFile:
+    def __init__(self, path: str):
+        self.path = path
+
+        # newest not yet written content - older ones are dropped (coalesced)
+        self.pending = None
+        self.writing = False
+        self.condition = Condition()
+
+        # last write failed (the exception) - its content stays pending and is retried
+        self.error = None
+        self.attempts = 0  # finished writes, successful or not
+
+        self.thread = Thread(target=self.writer, daemon=True)
+        self.thread.start()
+
+        # don't lose the last save when the game is closed
+        register(self.flush)
+
+    def save(self, data: dict):
+        # serialize now (data can be changed later), write in background
+        text = dumps(data, indent=4)
+        with self.condition:
+            self.pending = text
+            self.condition.notify_all()
+
+    def flush(self) -> bool:
+        # wait until everything saved so far is on the disk, False if it can't be written
+        # (a failed save is tried once more right away, not after the back off)
+        with self.condition:
+            attempts = self.attempts
+            self.condition.notify_all()
+            while self.pending is not None or self.writing:
+                if self.error is not None and self.attempts > attempts:
+                    return False
+                self.condition.wait()
+            return True
+
+    def writer(self):
+        delay = RETRY_DELAY
+        while True:
+            with self.condition:
+                while self.pending is None:
+                    self.condition.wait()
+                text = self.pending
+                self.pending = None
+                self.writing = True
+
+            # write to temporary file and swap it with the old one,
+            # crash during writing leaves previous save untouched
+            error = None
+            try:
+                with open(f"{self.path}.tmp", "w") as f:
+                    f.write(text)
+                    f.flush()
+                    fsync(f.fileno())
+                replace(f"{self.path}.tmp", self.path)
+            except Exception as exception:
+                error = exception
+
+            with self.condition:
+                self.writing = False
+                self.error = error
+                self.attempts += 1
+                if error is None:
+                    delay = RETRY_DELAY
+                else:
+                    # failed save is written again (unless there is a newer one) after a while,
+                    # waiting longer after every failure - save or flush wakes the writer earlier
+                    if self.pending is None:
+                        self.pending = text
+                    self.condition.notify_all()
+                    self.condition.wait(delay)
+                    delay = min(delay * 2, MAX_RETRY_DELAY)
+                self.condition.notify_all()
@@ -0,0 +1,41 @@
+from pygame.rect import Rect
+
+from .constants import ENEMY_AI_BUDGET, ENEMY_AI_INTERVAL, ENEMY_FULL_RATE_DISTANCE
+
+
+class EnemyScheduler:
+    def __init__(self):
+        # enemies are updated in tiers by the distance from the player:
+        # near - full update every frame (the same behaviour as always),
+        # on the screen - full updates spread over frames, only movement in between,
+        # outside of the screen (active rect margin) - only movement
+        # (idling and blinking still count down every frame, see EnemyBase.tick)
+        self.frame = 0
+
+    def update(self, enemies, viewport: Rect, active_rect: Rect, player_rect: Rect, tiles: set, platforms: set, constraints: list):
+        self.frame += 1
+        near_rect = player_rect.inflate(2 * ENEMY_FULL_RATE_DISTANCE, 2 * ENEMY_FULL_RATE_DISTANCE)
+        full = []
+        waiting = []  # on the screen, waiting for their next full update
+        moving = []
+        for enemy in enemies:
+            if enemy.simulation is not None:
+                continue  # moved by GroundSimulation
+            if near_rect.colliderect(enemy.rect):
+                full.append(enemy)
+            elif viewport.colliderect(enemy.rect) and self.frame - enemy.thought_at >= ENEMY_AI_INTERVAL:
+                waiting.append(enemy)
+            elif active_rect.colliderect(enemy.rect):
+                moving.append(enemy)  # on the screen between full updates or in the margin
+
+        # enemies waiting the longest get the budget, the rest waits for the next frame
+        waiting.sort(key=lambda enemy: enemy.thought_at)
+        full.extend(waiting[:ENEMY_AI_BUDGET])
+        moving.extend(waiting[ENEMY_AI_BUDGET:])
+
+        for enemy in full:
+            enemy.update(tiles, platforms, player_rect, constraints)
+            enemy.thought_at = self.frame
+        for enemy in moving:
+            enemy.move(tiles, platforms, constraints)
+            enemy.tick()
@@ -0,0 +1,269 @@
+from math import sin
+
+from numpy import bool_, concatenate, float64, floor, int32, nonzero, uint8, where, zeros
+from numpy.random import default_rng
+from pygame.rect import Rect
+from pygame.time import get_ticks
+
+from .constants import GRAVITY, TILE_SIZE
+from .entities import Slime, Spider, SpiderAdvanced
+from .render import frame_variant
+
+# kinds of simulated enemies
+SLIME, SPIDER, SPIDER_ADVANCED = 0, 1, 2
+
+# arrays of the simulation (one item per enemy)
+FIELDS = {"x": float64, "y": float64, "vx": float64, "vy": float64, "speed": float64, "width": int32, "height": int32,
+          "kind": uint8, "idling": bool_, "idle_timer": int32, "run": bool_, "frame": float64, "flip": bool_,
+          "idle_length": int32, "run_length": int32}
+
+
+class GroundSimulation:
+    def __init__(self, capacity=64):
+        # walking enemies (slimes and spiders) moved all at once with numpy, sprites only draw
+        # them and take hits (bullets and the player still collide with sprite rects)
+        self.count = 0
+        self.arrays = {name: zeros(capacity, dtype=dtype) for name, dtype in FIELDS.items()}
+        self.sprites = []
+        self.frames = []  # (idle frames, run frames) of every enemy
+        self.random = default_rng()
+
+        # level grids (rows, columns) - solid tiles, platforms and constraints (spiders turn around)
+        self.solid = zeros((1, 1), dtype=bool_)
+        self.floors = zeros((1, 1), dtype=bool_)
+        self.constraints = zeros((1, 1), dtype=bool_)
+
+    def set_level(self, level_data: dict):
+        layers = level_data["layers"]
+        self.solid = layers["collidable"] | layers["tiles"]
+        self.floors = self.solid | layers["platforms"]
+        self.constraints = level_data["constraint_cells"]
+
+    def clear(self):
+        for sprite in self.sprites:
+            sprite.simulation = None
+        self.count = 0
+        self.sprites.clear()
+        self.frames.clear()
+
+    def add(self, enemy):
+        if self.count == len(self.arrays["x"]):
+            for name, array in self.arrays.items():
+                self.arrays[name] = concatenate((array, zeros(len(array), dtype=array.dtype)))
+        if isinstance(enemy, Slime):
+            kind, frames = SLIME, (enemy.animation, enemy.animation)
+        elif isinstance(enemy, SpiderAdvanced):
+            kind, frames = SPIDER_ADVANCED, (enemy.animations["idle"], enemy.animations["run"])
+        else:
+            kind, frames = SPIDER, (enemy.animations["idle"], enemy.animations["run"])
+
+        index = self.count
+        values = {"x": enemy.rect.x, "y": enemy.rect.y, "vx": enemy.vector.x, "vy": enemy.vector.y, "speed": enemy.speed,
+                  "width": enemy.rect.width, "height": enemy.rect.height, "kind": kind, "idling": False, "idle_timer": 0,
+                  "run": False, "frame": 0, "flip": False, "idle_length": len(frames[0]), "run_length": len(frames[1])}
+        for name, value in values.items():
+            self.arrays[name][index] = value
+        self.sprites.append(enemy)
+        self.frames.append(frames)
+        enemy.simulation = self
+        enemy.simulation_index = index
+        self.count += 1
+
+    def remove(self, enemy):
+        # the last enemy takes the place of the removed one
+        index = enemy.simulation_index
+        last = self.count - 1
+        if index != last:
+            for array in self.arrays.values():
+                array[index] = array[last]
+            self.sprites[index] = self.sprites[last]
+            self.frames[index] = self.frames[last]
+            self.sprites[index].simulation_index = index
+        self.sprites.pop()
+        self.frames.pop()
+        self.count -= 1
+        enemy.simulation = None
+
+    def grid_cells(self, grid, first_row, last_row, first_column, last_column, spans: tuple):
+        # how many cells of the grid are set in the given ranges (rows/columns clipped to the grid)
+        rows, columns = grid.shape
+        count = zeros(len(first_row), dtype=int32)
+        for i in range(spans[0]):
+            row = (first_row + i).clip(0, rows - 1)
+            for j in range(spans[1]):
+                column = (first_column + j).clip(0, columns - 1)
+                inside = (first_row + i <= last_row) & (first_column + j <= last_column)
+                count += grid[row, column] & inside
+        return count
+
+    def step(self, active_rect: Rect, player_rect: Rect):
+        # one frame of every enemy in the active rect (the same rules as Slime/Spider/SpiderAdvanced.update)
+        if self.count == 0:
+            return
+        arrays = {name: array[:self.count] for name, array in self.arrays.items()}
+        x, y, width, height = arrays["x"], arrays["y"], arrays["width"], arrays["height"]
+        indices = nonzero((x < active_rect.right) & (x + width > active_rect.left) &
+                          (y < active_rect.bottom) & (y + height > active_rect.top))[0]
+        if len(indices) == 0:
+            return
+        state = {name: array[indices] for name, array in arrays.items()}
+        x, y, vx, vy, speed = state["x"], state["y"], state["vx"], state["vy"], state["speed"]
+        width, height, kind, idling, run = state["width"], state["height"], state["kind"], state["idling"], state["run"]
+        amount = len(indices)
+        spider = kind != SLIME
+        spans = (int(height.max()) // TILE_SIZE + 2, int(width.max()) // TILE_SIZE + 2)
+
+        # after idle - stop idling, randomly select direction of moving
+        moving = ~idling
+        state["idle_timer"] -= idling
+        waking = idling & (state["idle_timer"] <= 0)
+        vx[waking] *= self.random.choice((-1, 1), waking.sum())
+        idling &= ~waking
+        state["frame"][waking & spider & ~run] = 0
+        run |= waking & spider
+
+        # random idle (one in 200 frames for slimes, 50 for spiders)
+        rolled = moving & (self.random.random(amount) < where(spider, 1 / 50, 1 / 200))
+        idling |= rolled
+        state["idle_timer"][rolled] = self.random.integers(30, 71, rolled.sum())
+        state["frame"][rolled & spider & run] = 0
+        run &= ~(rolled & spider)
+
+        # update x position and check for horizontal collisions (the column in front of the enemy)
+        x += where(moving, vx, 0)
+        first_row = floor(y / TILE_SIZE).astype(int32)
+        last_row = floor((y + height - 1) / TILE_SIZE).astype(int32)
+        front = where(vx > 0, floor((x + width - 1) / TILE_SIZE), floor(x / TILE_SIZE)).astype(int32)
+        blocked = moving & (vx != 0) & (self.grid_cells(self.solid, first_row, last_row, front, front, spans) > 0)
+        x[:] = where(blocked & (vx > 0), front * TILE_SIZE - width, where(blocked & (vx < 0), (front + 1) * TILE_SIZE, x))
+        vx[blocked] *= -1
+
+        # spiders turn around on constraints (once for every constraint they touch)
+        first_column = floor(x / TILE_SIZE).astype(int32)
+        last_column = floor((x + width - 1) / TILE_SIZE).astype(int32)
+        touching = self.grid_cells(self.constraints, first_row, last_row, first_column, last_column, spans)
+        vx[moving & spider & (touching % 2 == 1)] *= -1
+
+        # update y position and check collisions with tiles and platforms (landing on the row under the enemy)
+        vy += GRAVITY
+        y += vy
+        row = floor((y + height) / TILE_SIZE).astype(int32)
+        landed = (y + height > row * TILE_SIZE) & (self.grid_cells(self.floors, row, row, first_column, last_column, spans) > 0)
+        y[:] = where(landed, row * TILE_SIZE - height, y)
+        vy[landed] = 0
+        vy[vy > 18] = 18
+
+        # advanced spiders go after the player they see
+        advanced = kind == SPIDER_ADVANCED
+        center = x + width // 2
+        bottom = y + height
+        sees = advanced & (center - 320 < player_rect.right) & (center + 320 > player_rect.left) & \
+            (bottom - 240 < player_rect.bottom) & (bottom > player_rect.top)
+        idling &= ~sees
+        state["frame"][sees & ~run] = 0
+        run |= sees
+        vx[:] = where(sees, where(player_rect.x < x - 5, -speed, where(player_rect.x > x + 5, speed, 0)), vx)
+        lost = advanced & ~sees & (vx == 0)
+        vx[lost] = speed[lost] * self.random.choice((-1, 1), lost.sum())
+
+        # animation (slimes and advanced spiders look the way they go)
+        state["frame"] += where(spider & run, 0.4, 0.2)
+        state["frame"][state["frame"] >= where(run, state["run_length"], state["idle_length"])] = 0
+        turns = kind != SPIDER
+        state["flip"] = where(turns & (vx > 0), True, where(turns & (vx < 0), False, state["flip"]))
+
+        for name, values in state.items():
+            arrays[name][indices] = values
+        self.sync(indices, state)
+
+    def sync(self, indices, state: dict):
+        # sprites get positions and images of the simulated enemies
+        for index, x, y, run, frame, flipped in zip(indices.tolist(), state["x"].tolist(), state["y"].tolist(),
+                                                    state["run"].tolist(), state["frame"].tolist(), state["flip"].tolist()):
+            sprite = self.sprites[index]
+            sprite.rect.topleft = (x, y)
+            image = self.frames[index][run][int(frame)]
+            image = frame_variant(image, flipped)
+
+            # blinking if damaged (dimmed copy, frames are shared)
+            if sprite.blinking:
+                sprite.blinking -= 1
+                if sin(get_ticks()) < 0:
+                    image = frame_variant(image, dimmed=True)
+            sprite.image = image
+
+
+# stress scene - walking enemies in an arena, sprite updates vs the simulation:
+# python -m data.modules.simulation (from the game directory)
+if __name__ == "__main__":
+    from os import environ
+    from random import choice, randint
+    from time import perf_counter
+    from pygame import init
+    from pygame.display import set_mode
+    from pygame.sprite import Group
+    from pygame.surface import Surface
+
+    from .functions import load_images
+    from .navigation import NavGraph
+    from .tiles import Platform, Tile
+
+    environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    init()
+    set_mode((1280, 720))
+
+    # arena - walls around, floors every 4 rows with a gap, platforms here and there
+    columns, rows = 40, 24
+    solid = zeros((rows, columns), dtype=bool_)
+    solid[0, :] = solid[-1, :] = solid[:, 0] = solid[:, -1] = True
+    for floor_row in range(4, rows - 1, 4):
+        gap = randint(2, columns - 6)
+        solid[floor_row, 1:gap] = solid[floor_row, gap + 3:-1] = True
+    platforms = zeros((rows, columns), dtype=bool_)
+    for _ in range(20):
+        platforms[randint(2, rows - 2), randint(1, columns - 2)] = True
+    platforms &= ~solid
+    level_data = {"layers": {"collidable": solid, "tiles": zeros((rows, columns), dtype=bool_), "platforms": platforms},
+                  "constraint_cells": zeros((rows, columns), dtype=bool_)}
+
+    stone = Surface((TILE_SIZE, TILE_SIZE))
+    tiles = {Tile((int(x) * TILE_SIZE, int(y) * TILE_SIZE), stone) for y, x in zip(*nonzero(solid))}
+    platform_tiles = {Platform((int(x) * TILE_SIZE, int(y) * TILE_SIZE), stone) for y, x in zip(*nonzero(platforms))}
+    slimes = load_images("data/img/slimes/green", "slime_", 1, 1)
+    spiders = (load_images("data/img/spider_small/idle", "spider_i_", 2, 1), load_images("data/img/spider_small/run", "spider_r_", 2, 1))
+    big_spiders = (load_images("data/img/spider_big/idle", "spider_", 1, 1), load_images("data/img/spider_big/run", "spider_", 1, 1))
+    area = Rect(0, 0, columns * TILE_SIZE, rows * TILE_SIZE)
+    player_rect = Rect(area.centerx, area.centery, 44, 64)
+    gold_group = Group()
+    nav_graph = NavGraph(solid.astype(uint8) + platforms.astype(uint8) * 3)
+
+    def spawn(amount: int) -> list:
+        enemies = []
+        for _ in range(amount):
+            while True:
+                x, y = randint(1, columns - 2), randint(1, rows - 2)
+                if not solid[y, x]:
+                    break
+            position = (x * TILE_SIZE, y * TILE_SIZE)
+            enemies.append(choice((Slime(position, slimes, gold_group), Spider(position, spiders, gold_group),
+                                   SpiderAdvanced(position, big_spiders, gold_group, nav_graph))))
+        return enemies
+
+    for amount in (50, 200, 500, 1000):
+        frames = 20
+        enemies = spawn(amount)
+        start = perf_counter()
+        for _ in range(frames):
+            for enemy in enemies:
+                enemy.update(tiles, platform_tiles, player_rect, [])
+        sprites_time = (perf_counter() - start) / frames * 1000
+
+        simulation = GroundSimulation()
+        simulation.set_level(level_data)
+        for enemy in spawn(amount):
+            simulation.add(enemy)
+        start = perf_counter()
+        for _ in range(frames):
+            simulation.step(area, player_rect)
+        simulation_time = (perf_counter() - start) / frames * 1000
+        print(f"{amount} enemies: sprites {sprites_time:.2f} ms/frame, simulation {simulation_time:.2f} ms/frame")
@@ -1,10 +1,12 @@
-from pygame.font import Font, init
+from pygame.font import init
 from pygame.sprite import Sprite
-from pygame.surface import Surface
+
+from .assets import load_font
+from .render import RenderQueue
 
 init()
 
-font = Font("data/fonts/Pixellari.ttf", 32)
+font = load_font("data/fonts/Pixellari.ttf", 32)
 
 
 class DamageText(Sprite):
@@ -14,18 +16,15 @@ class DamageText(Sprite):
         self.rect = self.image.get_rect(center=position)
         self.alpha = 255
 
-    def draw(self, screen: Surface, scroll: list):
-        screen.blit(self.image, (self.rect.x - scroll[0], self.rect.y - scroll[1]))
+    def draw(self, queue: RenderQueue, scroll: list):
+        queue.blit(self.image, (self.rect.x - scroll[0], self.rect.y - scroll[1]))
 
-    def update(self, screen: Surface, scroll: list):
+    def update(self):
         # move damage text up
         self.image.set_alpha(self.alpha)
         self.alpha -= 5
         self.rect.y -= 2
 
-        # draw text
-        self.draw(screen, scroll)
-
         # kill sprite if it's invisible
         if self.alpha <= 0:
             self.kill()
@@ -5,6 +5,7 @@ from pygame.sprite import Sprite
 from pygame.surface import Surface
 
 from .particles import TorchParticle
+from .render import RenderQueue
 
 
 class Tile(Sprite):
@@ -14,8 +15,8 @@ class Tile(Sprite):
         self.image = image
         self.rect = self.image.get_rect(topleft=position)
 
-    def draw(self, screen: Surface, scroll: list):
-        screen.blit(self.image, (self.rect.x - scroll[0], self.rect.y - scroll[1]))
+    def draw(self, queue: RenderQueue, scroll: list):
+        queue.blit(self.image, (self.rect.x - scroll[0], self.rect.y - scroll[1]))
 
 
 class Platform(Tile):
@@ -40,33 +41,41 @@ class Upgrade(Tile):
         self.collision_rect = Rect(position[0], position[1] - 64, 64, 192)
 
 
-class AnimatedTile(Tile):
-    def __init__(self, position: tuple, images: tuple, cooldown: float):
-        super().__init__(position, images[0])
+class Animation:
+    def __init__(self, images: tuple, speed: float):
+        # one timeline shared by every tile of the same type, advanced once per frame
+        self.images = images
+        self.length = len(images)
+        self.speed = speed  # animation frames per game frame
+        self.time = 0.0
 
-        self.animation = images
-        self.ANIMATION_LENGTH = len(self.animation)
-        self.frame_index = 0
-        self.COOLDOWN = cooldown
+    def update(self):
+        self.time = (self.time + self.speed) % self.length
 
-    def update_animation(self):
-        # update animation frame
-        self.frame_index += self.COOLDOWN
-        if self.frame_index >= self.ANIMATION_LENGTH:
-            self.frame_index = 0
+    def frame(self, phase=0) -> Surface:
+        return self.images[int(self.time + phase) % self.length]
 
-        # set new frame to the image
-        self.image = self.animation[int(self.frame_index)]
 
-    def update(self, screen: Surface, scroll: list):
-        self.update_animation()
+class AnimatedTile(Sprite):
+    def __init__(self, position: tuple, animation: Animation, phase=0):
+        super().__init__()
+
+        # tile holds only its phase, the current image comes from the shared animation
+        self.animation = animation
+        self.phase = phase
+        self.rect = animation.images[0].get_rect(topleft=position)
 
-        self.draw(screen, scroll)
+    @property
+    def image(self) -> Surface:
+        return self.animation.frame(self.phase)
+
+    def draw(self, queue: RenderQueue, scroll: list):
+        queue.blit(self.image, (self.rect.x - scroll[0], self.rect.y - scroll[1]))
 
 
 class Lava(AnimatedTile):
-    def __init__(self, position: tuple, images: tuple):
-        super().__init__(position, images, 0.1)
+    def __init__(self, position: tuple, animation: Animation):
+        super().__init__(position, animation)
 
         self.damage = (2, 3)
 
@@ -77,24 +86,14 @@ class LavaTile(Tile):
 
         self.damage = (2, 3)
 
-    def update(self, screen: Surface, scroll: list):
-        self.draw(screen, scroll)
-
 
 class Torch(AnimatedTile):
-    def __init__(self, position: tuple, images: tuple):
-        super().__init__(position, images, 0.25)
-
-        self.frame_index = randint(0, self.ANIMATION_LENGTH - 1)
-        self.image = self.animation[self.frame_index]
-
-    def update(self, screen: Surface, scroll: list, particles_group: set):
-        self.update_animation()
-
-        self.draw(screen, scroll)
+    def __init__(self, position: tuple, animation: Animation):
+        super().__init__(position, animation, randint(0, animation.length - 1))
 
-        # randomly generate particle
-        if randint(1, 25) == 1:
+    def update(self, particles_group: set, particle_chance=25):
+        # randomly generate particle (one in particle_chance frames)
+        if randint(1, particle_chance) == 1:
             particles_group.add(
                 TorchParticle([self.rect.centerx, self.rect.y + 32])
             )
@@ -1,29 +1,28 @@
 # Imports ------------------------------------------------------------------- #
-from json import dump as dump_to_json
 from json import load as load_json
 from sys import exit
 from os import listdir
 
-from PIL.Image import frombytes
-from PIL.ImageFilter import GaussianBlur
 from pygame import init, quit
 from pygame.display import set_caption, set_mode, toggle_fullscreen, set_icon
 from pygame.display import update as update_display
 from pygame.event import get as get_events
 from pygame.event import set_allowed as set_allowed_events
-from pygame.font import Font
-from pygame.image import fromstring, tostring
-from pygame.image import load as load_image
 from pygame.locals import (K_DOWN, K_ESCAPE, K_F10, K_F11, K_F12, K_LEFT,
                            K_RIGHT, K_SPACE, K_UP, KEYDOWN, KEYUP, QUIT, K_c,
                            K_x, K_z)
 from pygame.mouse import set_visible
-from pygame.time import Clock
+from pygame.surface import Surface
+from pygame.time import Clock, get_ticks
 
+from data.modules.assets import load_font, load_image
 from data.modules.constants import BLACK, FPS, RED, SCREEN_SIZE, WHITE
 from data.modules.level import Level
 from data.modules.menus import Menu, PauseMenu, SettingsMenu
-from data.modules.functions import screen_fade
+from data.modules.history import RunHistory
+from data.modules.saves import SaveFile
+from data.modules.classes import ScreenFade
+from data.modules.functions import blur_surface
 
 # Init ---------------------------------------------------------------------- #
 init()
@@ -31,6 +30,13 @@ init()
 with open("settings.json", "r") as f:
     settings = load_json(f)
 
+# save files are written in background
+save_file = SaveFile("save.json")
+settings_file = SaveFile("settings.json")
+
+# every finished run
+run_history = RunHistory("history.db")
+
 screen = set_mode(SCREEN_SIZE)
 set_caption("The Mine")
 
@@ -45,7 +51,7 @@ set_visible(False)
 
 clock = Clock()
 
-fps_font = Font("data/fonts/Pixellari.ttf", 40)
+fps_font = load_font("data/fonts/Pixellari.ttf", 40)
 
 set_allowed_events((QUIT, KEYDOWN, KEYUP))
 
@@ -60,86 +66,85 @@ def credits():
         (SCREEN_SIZE[0] // 2, SCREEN_SIZE[1] // 4 + 128)
     )
 
-    screen.fill(BLACK)
+    # static screen - rendered once
+    background = Surface(SCREEN_SIZE)
     for text, pos in zip(texts, positions):
         text_surf = fps_font.render(text, True, WHITE)
         text_rect = text_surf.get_rect(center=pos)
-        screen.blit(text_surf, text_rect)
-    screen_fade(screen, clock, False)
-
-    while True:
-        # clear screen
-        screen.fill(BLACK)
+        background.blit(text_surf, text_rect)
 
-        for text, pos in zip(texts, positions):
-            text_surf = fps_font.render(text, True, WHITE)
-            text_rect = text_surf.get_rect(center=pos)
-            screen.blit(text_surf, text_rect)
+    # fade in
+    transition = ScreenFade(False)
 
+    while True:
         for event in get_events():
             if event.type == QUIT:
                 quit()
                 exit()
-            if event.type == KEYDOWN:
-                screen_fade(screen, clock, True)
-                return
-        update_display()
+            if event.type == KEYDOWN and (transition is None or not transition.fading):
+                transition = ScreenFade(True)
+
+        # screen transition (whole screen changes)
+        if transition is not None:
+            screen.blit(background, (0, 0))
+            transition.draw(screen)
+            if transition.finished:
+                if transition.fading:
+                    return
+                transition = None
+            update_display()
+        # nothing changes
+        else:
+            update_display([])
+
         clock.tick(FPS)
 
 
 # Settings menu ------------------------------------------------------------- #
 def settings_menu_loop():
     menu = SettingsMenu(settings)
+    background = Surface(SCREEN_SIZE)
 
-    screen.fill(BLACK)
-    menu.draw(screen)
-    screen_fade(screen, clock, False)
+    # fade in
+    transition = ScreenFade(False)
+    full_redraw = False  # display recreated or cleared (toggled fullscreen)
 
     while True:
-        # clear screen
-        screen.fill(BLACK)
-
-        # draw menu
-        menu.draw(screen)
-
         # check events
         for event in get_events():
             if event.type == QUIT:
                 # save settings before quitting
-                with open("settings.json", "w") as f:
-                    dump_to_json(settings, f, indent=4)
+                settings_file.save(settings)
                 quit()
                 exit()
 
-            if event.type == KEYDOWN:
+            if event.type == KEYDOWN and (transition is None or not transition.fading):
                 # leave settings menu
                 if event.key == K_ESCAPE:
-                    with open("settings.json", "w") as f:
-                        dump_to_json(settings, f, indent=4)
-                    screen_fade(screen, clock, True)
-                    return
+                    settings_file.save(settings)
+                    transition = ScreenFade(True)
                 # select highlighted option in menu
                 if event.key in (K_SPACE, K_z):
                     # toggle fullscreen
                     if menu.highlighted == 0:
                         settings["fullscreen"] = not settings["fullscreen"]
                         toggle_fullscreen()
+                        full_redraw = True
                     elif menu.highlighted == 3:
-                        save_data = {"kills": 0, "deaths": 0, "depth": 0, "highscores": []}
-                        with open("save.json", "w") as f:
-                            dump_to_json(save_data, f, indent=4)
-                            return True
+                        save_data = {"kills": 0, "deaths": 0, "depth": 0}
+                        save_file.save(save_data)
+                        run_history.clear()
+                        return True
                     # leave settings menu
                     elif menu.highlighted == 4:
-                        with open("settings.json", "w") as f:
-                            dump_to_json(settings, f, indent=4)
-                        screen_fade(screen, clock, True)
-                        return
+                        settings_file.save(settings)
+                        transition = ScreenFade(True)
                 if event.key == K_LEFT:
                     # toggle fullscreen
                     if menu.highlighted == 0:
                         settings["fullscreen"] = not settings["fullscreen"]
                         toggle_fullscreen()
+                        full_redraw = True
                     # music volume down
                     elif menu.highlighted == 1:
                         if settings["music"] > 0:
@@ -153,6 +158,7 @@ def settings_menu_loop():
                     if menu.highlighted == 0:
                         settings["fullscreen"] = not settings["fullscreen"]
                         toggle_fullscreen()
+                        full_redraw = True
                     # music volume up
                     elif menu.highlighted == 1:
                         if settings["music"] < 100:
@@ -171,33 +177,50 @@ def settings_menu_loop():
         # update menu (change highlight)
         menu.update()
 
-        update_display()
+        # screen transition or toggled fullscreen (whole screen changes)
+        if transition is not None or full_redraw:
+            full_redraw = False
+            screen.blit(background, (0, 0))
+            menu.draw(screen)
+            if transition is not None:
+                transition.draw(screen)
+                if transition.finished:
+                    if transition.fading:
+                        return
+                    transition = None
+            update_display()
+        # redraw only changed texts
+        else:
+            update_display(menu.draw_changes(screen, background))
+
         clock.tick(FPS)
 
 
 # Pause menu loop ----------------------------------------------------------- #
 def pause_menu_loop():
-    # convert pygame surface to pillow image and blur it
-    str_surf = tostring(screen.copy(), "RGB", False)
-    blurred = frombytes("RGB", SCREEN_SIZE, str_surf).filter(GaussianBlur(5))
-    # convert pillow image to pygame surface
-    str_surf = blurred.tobytes("raw", "RGB")
-    blurred = fromstring(str_surf, SCREEN_SIZE, "RGB")
+    # blur game frame in the background of the menu
+    blurred = blur_surface(screen)
 
     menu = PauseMenu()
+    transition = None
+    selected = None
 
-    while True:
-        screen.blit(blurred, (0, 0))
-        # draw pause menu (smaller rect, without clearing screen)
-        menu.draw(screen)
+    # everything under menu texts
+    background = blurred.copy()
+    menu.draw_panel(background)
 
+    screen.blit(background, (0, 0))
+    menu.draw(screen)
+    update_display()
+
+    while True:
         # check events
         for event in get_events():
             if event.type == QUIT:
                 quit()
                 exit()
 
-            if event.type == KEYDOWN:
+            if event.type == KEYDOWN and (transition is None or not transition.fading):
                 # unpause game
                 if event.key == K_ESCAPE:
                     return True
@@ -206,18 +229,10 @@ def pause_menu_loop():
                     # unpause game
                     if menu.highlighted == 0:
                         return True
-                    elif menu.highlighted == 1:
-                        screen_fade(screen, clock, True)
-                        reset = settings_menu_loop()
-                        if reset:
-                            return False
-                        screen.blit(blurred, (0, 0))
-                        menu.draw(screen)
-                        screen_fade(screen, clock, False)
-                    # return to main menu
-                    elif menu.highlighted == 2:
-                        screen_fade(screen, clock, True)
-                        return False
+                    # settings or return to main menu (after fading out)
+                    elif menu.highlighted in (1, 2):
+                        selected = menu.highlighted
+                        transition = ScreenFade(True)
                 # move highlight up
                 if event.key == K_UP:
                     menu.key_up = True
@@ -228,20 +243,40 @@ def pause_menu_loop():
         # update menu (change highlight)
         menu.update()
 
-        update_display()
+        # screen transition (whole screen changes)
+        if transition is not None:
+            screen.blit(background, (0, 0))
+            menu.draw(screen)
+            transition.draw(screen)
+            if transition.finished:
+                if transition.fading:
+                    # settings
+                    if selected == 1:
+                        reset = settings_menu_loop()
+                        if reset:
+                            return False
+                        transition = ScreenFade(False)
+                        continue
+                    # return to main menu
+                    return False
+                transition = None
+            update_display()
+        # redraw only changed texts
+        else:
+            update_display(menu.draw_changes(screen, background))
+
         clock.tick(FPS)
 
 
 # Game loop ----------------------------------------------------------------- #
 def game_loop(save_data):
-    level = Level(screen, clock, save_data)
+    level = Level(screen, clock, save_data, save_file, run_history)
 
     fps = FPS
     toggle_fps = False
 
-    screen.fill(BLACK)
-    level.run()
-    screen_fade(screen, clock, False)
+    # fade in while the level is already running
+    level.transition = ScreenFade(False)
 
     looping = True
     while looping:
@@ -255,30 +290,23 @@ def game_loop(save_data):
         else:
             level.save_data["deaths"] += 1
             level.score += level.current_level * 100
-            if len(level.save_data["highscores"]) < 5:
-                level.save_data["highscores"].append(level.score)
-            else:
-                if level.score > min(level.save_data["highscores"]):
-                    level.save_data["highscores"].remove(min(level.save_data["highscores"]))
-                    level.save_data["highscores"].append(level.score)
-            
-            with open("save.json", "w") as f:
-                    dump_to_json(level.save_data, f, indent=4)
+            run_history.add_run(level.score, level.current_level, level.kills, level.player.gold, level.selected_gun, (get_ticks() - level.start_ticks) / 1000)
+
+            save_file.save(level.save_data)
+            level.cancel_prefetching()
             return
 
         # check events
         for event in get_events():
             if event.type == QUIT:
-                with open("save.json", "w") as f:
-                    dump_to_json(level.save_data, f, indent=4)
+                save_file.save(level.save_data)
                 quit()
                 exit()
 
             if event.type == KEYDOWN:
                 # pause game
                 if event.key == K_ESCAPE:
-                    with open("save.json", "w") as f:
-                        dump_to_json(level.save_data, f, indent=4)
+                    save_file.save(level.save_data)
                     looping = pause_menu_loop()
                     # reset keys
                     level.player.left = False
@@ -353,72 +381,53 @@ def game_loop(save_data):
                 fps_font.render(str(int(clock.get_fps())), False, RED),
                 (8, 8)
             )
+            # effects given up by the quality governor
+            if level.quality.degraded:
+                screen.blit(
+                    fps_font.render(f"quality -{level.quality.degraded}", False, RED),
+                    (8, 48)
+                )
         update_display()
         clock.tick(fps)
+        level.quality.update(clock.get_rawtime())
+    level.cancel_prefetching()
 
 
 # Main menu loop ------------------------------------------------------------ #
 def main_menu():
     menu = Menu()
 
-    screen.blit(background_img, (0, 0))
-    menu.draw(screen)
-    screen_fade(screen, clock, False)
+    # fade in
+    transition = ScreenFade(False)
+    selected = None
+    save_data = None
 
     while True:
-        # draw background
-        screen.blit(background_img, (0, 0))
-
-        # draw menu (texts)
-        menu.draw(screen)
-
         # check events
         for event in get_events():
             if event.type == QUIT:
-                screen_fade(screen, clock, True)
-                quit()
-                exit()
+                selected = 3
+                transition = ScreenFade(True)
 
-            if event.type == KEYDOWN:
+            if event.type == KEYDOWN and (transition is None or not transition.fading):
                 if event.key == K_ESCAPE:
-                    screen_fade(screen, clock, True)
-                    quit()
-                    exit()
+                    selected = 3
+                    transition = ScreenFade(True)
                 # select highlighted option in menu
                 if event.key in (K_SPACE, K_z):
-                    # start game
-                    if menu.highlighted == 0:
+                    selected = menu.highlighted
+                    # start game - read save file while fading out
+                    if selected == 0:
+                        save_file.flush()  # read what was saved last
                         if "save.json" in listdir():
                             with open("save.json", "r") as f:
                                 save_data = load_json(f)
+                            if run_history.import_highscores(save_data):
+                                save_file.save(save_data)  # without the imported scores
                         else:  # create save file if not exists
-                            save_data = {"kills": 0, "deaths": 0, "depth": 0, "highscores": []}
-                            with open("save.json", "w") as f:
-                                dump_to_json(save_data, f, indent=4)
-                        screen_fade(screen, clock, True)
-                        game_loop(save_data)
-                        screen.blit(background_img, (0, 0))
-                        menu.draw(screen)
-                        screen_fade(screen, clock, False)
-                    # settings
-                    elif menu.highlighted == 1:
-                        screen_fade(screen, clock, True)
-                        settings_menu_loop()
-                        screen.blit(background_img, (0, 0))
-                        menu.draw(screen)
-                        screen_fade(screen, clock, False)
-                    # credits
-                    elif menu.highlighted == 2:
-                        screen_fade(screen, clock, True)
-                        credits()
-                        screen.blit(background_img, (0, 0))
-                        menu.draw(screen)
-                        screen_fade(screen, clock, False)
-                    # quit game
-                    elif menu.highlighted == 3:
-                        screen_fade(screen, clock, True)
-                        quit()
-                        exit()
+                            save_data = {"kills": 0, "deaths": 0, "depth": 0}
+                            save_file.save(save_data)
+                    transition = ScreenFade(True)
                 # move highlight up
                 if event.key == K_UP:
                     menu.key_up = True
@@ -429,7 +438,34 @@ def main_menu():
         # update menu (change highlight)
         menu.update()
 
-        update_display()
+        # screen transition (whole screen changes)
+        if transition is not None:
+            screen.blit(background_img, (0, 0))
+            menu.draw(screen)
+            transition.draw(screen)
+            if transition.finished:
+                if transition.fading:
+                    # start game
+                    if selected == 0:
+                        game_loop(save_data)
+                    # settings
+                    elif selected == 1:
+                        settings_menu_loop()
+                    # credits
+                    elif selected == 2:
+                        credits()
+                    # quit game
+                    elif selected == 3:
+                        quit()
+                        exit()
+                    transition = ScreenFade(False)
+                else:
+                    transition = None
+            update_display()
+        # redraw only changed texts
+        else:
+            update_display(menu.draw_changes(screen, background_img))
+
         clock.tick(FPS)
 
 
@@ -0,0 +1,55 @@
+from numpy import ones, uint8
+
+from data.modules import generator
+from data.modules.generator import find_reachable, generate_level
+
+
+def check_doors(map_data, doors: dict):
+    # entrance ("player") and exit are two different doors, the exit reachable from the entrance
+    assert len(doors) == 2
+    cells = {leads_to: (int(key.split(";")[1]), int(key.split(";")[0])) for key, leads_to in doors.items()}
+    entrance = cells.pop("player")
+    (exit, ) = cells.values()
+    assert map_data[entrance] == 4 and map_data[exit] == 4
+    assert exit in find_reachable(map_data, entrance)
+
+
+def test_generated_levels():
+    for depth in (12, 20, 40):
+        map_data, decorations_data, enemies_data, doors = generate_level(depth)
+        assert map_data.shape == decorations_data.shape == enemies_data.shape == generator.level_size(depth)
+        check_doors(map_data, doors)
+
+
+def test_generated_again_without_room_for_doors(monkeypatch):
+    # solid stone (no floor at all), a pocket with a single floor cell, then a real cave
+    def stone(height, width):
+        return ones((height, width), dtype=uint8)
+
+    def pocket(height, width):
+        cave = stone(height, width)
+        cave[height // 2 - 1:height // 2 + 1, width // 2] = 0
+        return cave
+
+    caves = [stone, pocket, generator.generate_map]
+    calls = []
+
+    def generate_map(height, width):
+        calls.append((height, width))
+        return caves[min(len(calls), len(caves)) - 1](height, width)
+
+    monkeypatch.setattr(generator, "generate_map", generate_map)
+    map_data, _, _, doors = generate_level(12)
+    assert len(calls) >= 3
+    check_doors(map_data, doors)
+
+
+def test_enemies_grow_with_depth():
+    # every level gets all enemies of its depth (small caves are generated again)
+    counts = []
+    for depth in (12, 16, 20, 30):
+        for _ in range(3):
+            _, _, enemies_data, _ = generate_level(depth)
+            assert (enemies_data != 0).sum() == min(12 + 2 * (depth - generator.HANDMADE_LEVELS), 60)
+        counts.append(int((enemies_data != 0).sum()))
+    assert counts == sorted(counts) and len(set(counts)) == len(counts)
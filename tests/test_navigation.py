@@ -0,0 +1,52 @@
+from numpy import nonzero, uint8, zeros
+from pygame.rect import Rect
+from pygame.surface import Surface
+
+from data.modules.constants import TILE_SIZE
+from data.modules.entities import SpiderAdvanced
+from data.modules.navigation import NavGraph
+from data.modules.tiles import Tile
+
+
+def ledge_map():
+    # floor at row 10, ledge (columns 1-5) with its top at row 6, gap to the right of it
+    map_data = zeros((12, 16), dtype=uint8)
+    map_data[0, :] = map_data[-1, :] = map_data[:, 0] = map_data[:, -1] = 1
+    map_data[10, :] = 1
+    map_data[6, 1:6] = 1
+    return map_data
+
+
+def overhanging_rect() -> Rect:
+    # standing on the last ledge tile (column 5) with its center above the gap (column 6)
+    return Rect(5 * TILE_SIZE + 40, 5 * TILE_SIZE, TILE_SIZE, TILE_SIZE)
+
+
+def test_cell_at_uses_supporting_tile():
+    nav_graph = NavGraph(ledge_map())
+    assert nav_graph.cell_at(overhanging_rect()) == (5, 5)
+
+
+def test_cell_at_falling():
+    nav_graph = NavGraph(ledge_map())
+    assert nav_graph.cell_at(Rect(8 * TILE_SIZE, 2 * TILE_SIZE + 10, TILE_SIZE, TILE_SIZE)) == (8, 9)
+
+
+def test_spider_on_ledge_overhang():
+    map_data = ledge_map()
+    nav_graph = NavGraph(map_data)
+    tiles = {Tile((int(x) * TILE_SIZE, int(y) * TILE_SIZE), Surface((TILE_SIZE, TILE_SIZE))) for y, x in zip(*nonzero(map_data))}
+    images = ((Surface((TILE_SIZE, TILE_SIZE)), ), (Surface((TILE_SIZE, TILE_SIZE)), ))
+    spider = SpiderAdvanced((0, 0), images, set(), nav_graph)
+    spider.rect = overhanging_rect()
+
+    # jump to a cell below the spider - no jumping at all
+    spider.follow(((8, 9), "jump", 3))
+    assert spider.vector.y == 0
+
+    # player on the floor below it - drops down after it
+    player_rect = Rect(9 * TILE_SIZE, 9 * TILE_SIZE, 44, TILE_SIZE)
+    assert nav_graph.next_step(spider.rect, player_rect)[1] == "drop"
+    for _ in range(120):
+        spider.update(tiles, set(), player_rect, [])
+    assert nav_graph.cell_at(spider.rect)[1] == 9